@@ -1,7 +1,4 @@
 import networkx as nx
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import matplotlib.patches as mpatches
 import numpy as np
 from src.graph import load_graph
 from src.layout import load_layout
@@ -16,31 +13,31 @@ CLUSTER_COLORS = [
 ]
 
 def assign_clusters(G: nx.Graph) -> dict:
-    # Use community detection to find clusters
-    from networkx.algorithms import community
-    
-    communities = community.greedy_modularity_communities(G)
+    # Community detection runs once per graph version — repeat calls read the stored result
+    from src.clustering import cluster_graph
     
     node_cluster = {}
-    for i, comm in enumerate(communities):
-        color = CLUSTER_COLORS[i % len(CLUSTER_COLORS)]
-        for node in comm:
-            node_cluster[node] = {
-                "cluster_id": i,
-                "color": color
-            }
+    for node, i in cluster_graph(G).items():
+        node_cluster[node] = {
+            "cluster_id": i,
+            "color": CLUSTER_COLORS[i % len(CLUSTER_COLORS)]
+        }
     
     return node_cluster
 
 def get_node_order(G: nx.Graph) -> list:
-    # Sort nodes by degree descending — most connected appear first
-    return [node for node, degree in sorted(
-        G.degree(), key=lambda x: x[1], reverse=True
-    )]
+    # Most important first — precomputed PageRank when present, otherwise degree
+    from src.metrics import node_importance
+    importance = node_importance(G)
+    return sorted(G.nodes(), key=lambda node: importance[node], reverse=True)
 
 def build_animation(G: nx.Graph, pos: dict, output_path: str = "output/knowledge_graph.gif"):
     print("Building animation...")
     
+    # matplotlib is only needed here — keep it off the app's import path
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    
     node_clusters = assign_clusters(G)
     node_order = get_node_order(G)
     
@@ -58,13 +55,14 @@ def build_animation(G: nx.Graph, pos: dict, output_path: str = "output/knowledge
     # Convert pos keys to match graph nodes
     valid_pos = {n: pos[n] for n in G.nodes() if n in pos}
     
-    # Precompute node sizes based on degree
-    max_degree = max(dict(G.degree()).values())
+    # Node sizes from the precomputed importance values
+    from src.metrics import node_importance
+    importance = node_importance(G)
+    max_importance = max(importance.values()) or 1
     
     def get_node_size(node):
-        degree = G.degree(node)
         # Scale between 100 and 800
-        return 100 + (degree / max_degree) * 700
+        return 100 + (importance[node] / max_importance) * 700
     
     # Animation step — show first N nodes and their edges
     def animate(frame):
@@ -104,7 +102,7 @@ def build_animation(G: nx.Graph, pos: dict, output_path: str = "output/knowledge
             ax.scatter(x, y, c=color, s=size, alpha=0.9, zorder=5)
             
             # Only label high degree nodes to avoid clutter
-            if G.degree(node) >= 4:
+            if G.nodes[node].get("size", 0) >= 4:
                 ax.annotate(
                     node,
                     (x, y),
@@ -0,0 +1,206 @@
+import os
+import numpy as np
+from src.embeddings import normalize_rows, exact_similarity, similar_pair_indices
+from src.node_table import NodeTable
+
+# Approximate nearest neighbours for the "semantically similar" edges.
+# An IVF-flat index in plain numpy: vectors are bucketed under k-means
+# centroids and a query only scans the buckets of its nprobe nearest
+# centroids, so building the kNN graph is roughly O(n · n/n_lists · nprobe)
+# instead of O(n²). New vectors are bucketed against the existing
+# centroids, so adding concepts never needs a rebuild.
+
+INDEX_PATH = "output/ann_index.npz"
+
+def _spherical_kmeans(x: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = _nearest_centroid(x, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=n_lists)
+
+        # Re-seed empty lists from random points so every list stays useful
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    return centroids
+
+def _nearest_centroid(x: np.ndarray, centroids: np.ndarray, block_rows: int = 8192) -> np.ndarray:
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), block_rows):
+        assign[start:start + block_rows] = np.argmax(x[start:start + block_rows] @ centroids.T, axis=1)
+    return assign
+
+class IVFIndex:
+    def __init__(self, n_lists: int | None = None, nprobe: int = 8, seed: int = 42):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids = None
+        self._vectors = np.empty((0, 0), dtype=np.float32)   # unit rows, capacity-doubled
+        self._lists = np.empty(0, dtype=np.int64)            # list id per row
+        self.size = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    @property
+    def assignments(self) -> np.ndarray:
+        return self._lists[:self.size]
+
+    def train(self, vectors: np.ndarray, sample: int = 50_000):
+        x, _ = normalize_rows(vectors)
+        if self.n_lists is None:
+            self.n_lists = max(1, int(4 * np.sqrt(len(x))))
+        self.n_lists = min(self.n_lists, len(x))
+
+        rng = np.random.default_rng(self.seed)
+        if len(x) > sample:
+            x = x[rng.choice(len(x), size=sample, replace=False)]
+        self.centroids = _spherical_kmeans(x, self.n_lists, seed=self.seed)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        # Returns the row ids given to the new vectors (positions in add order)
+        if self.centroids is None:
+            self.train(vectors)
+
+        x, _ = normalize_rows(vectors)
+        x = np.nan_to_num(x)
+        lists = _nearest_centroid(x, self.centroids)
+
+        needed = self.size + len(x)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            grown = np.empty((capacity, x.shape[1]), dtype=np.float32)
+            grown_lists = np.empty(capacity, dtype=np.int64)
+            if self.size:
+                grown[:self.size] = self.vectors
+                grown_lists[:self.size] = self.assignments
+            self._vectors, self._lists = grown, grown_lists
+
+        self._vectors[self.size:needed] = x
+        self._lists[self.size:needed] = lists
+        ids = np.arange(self.size, needed)
+        self.size = needed
+        return ids
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        # Returns (ids, similarities), each (len(queries), k), best first; -1 pads short results
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        q, _ = normalize_rows(queries)
+        q = np.nan_to_num(q)
+        nq = len(q)
+
+        probes = np.argpartition(-(q @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        best_ids = np.full((nq, k), -1, dtype=np.int64)
+        best_sims = np.full((nq, k), -np.inf, dtype=np.float32)
+
+        # Work list by list: every query probing a list is scored against it in one product
+        order = np.argsort(self.assignments, kind="stable")
+        bounds = np.searchsorted(self.assignments[order], np.arange(self.n_lists + 1))
+        probe_order = np.argsort(probes.ravel(), kind="stable")
+        probe_bounds = np.searchsorted(probes.ravel()[probe_order], np.arange(self.n_lists + 1))
+        for lst in range(self.n_lists):
+            members = order[bounds[lst]:bounds[lst + 1]]
+            who = probe_order[probe_bounds[lst]:probe_bounds[lst + 1]] // nprobe
+            if len(members) == 0 or len(who) == 0:
+                continue
+
+            sims = q[who] @ self.vectors[members].T
+            all_sims = np.concatenate([best_sims[who], sims], axis=1)
+            all_ids = np.concatenate([best_ids[who], np.broadcast_to(members, sims.shape)], axis=1)
+            top = np.argpartition(-all_sims, k - 1, axis=1)[:, :k]
+            best_sims[who] = np.take_along_axis(all_sims, top, axis=1)
+            best_ids[who] = np.take_along_axis(all_ids, top, axis=1)
+
+        ranking = np.argsort(-best_sims, axis=1)
+        return np.take_along_axis(best_ids, ranking, axis=1), np.take_along_axis(best_sims, ranking, axis=1)
+
+    def save(self, path: str = INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            vectors=self.vectors,
+            lists=self.assignments,
+            params=np.array([self.n_lists, self.nprobe, self.seed])
+        )
+        print(f"ANN index saved to {path} ({self.size} vectors, {self.n_lists} lists)")
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> "IVFIndex":
+        data = np.load(path)
+        n_lists, nprobe, seed = (int(v) for v in data["params"])
+        index = cls(n_lists=n_lists, nprobe=nprobe, seed=seed)
+        index.centroids = data["centroids"]
+        index._vectors = data["vectors"]
+        index._lists = data["lists"]
+        index.size = len(index._vectors)
+        return index
+
+def ann_pair_indices(index: IVFIndex, vectors: np.ndarray, threshold: float = 0.75, k: int = 10,
+                     nprobe: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # kNN-plus-threshold pairs over the index's own rows — same (rows, cols,
+    # weights) shape as similar_pair_indices. `vectors` are the raw rows the
+    # index was built from, used for the exact float64 rescore.
+    ids, sims = index.search(index.vectors, k=k + 1, nprobe=nprobe)
+    rows = np.repeat(np.arange(index.size), ids.shape[1])
+    cols = ids.ravel()
+    keep = (cols >= 0) & (cols != rows) & (sims.ravel() > threshold - 1e-4)
+    pairs = np.unique(np.stack([np.minimum(rows[keep], cols[keep]), np.maximum(rows[keep], cols[keep])], axis=1), axis=0)
+    if len(pairs) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    _, norms = normalize_rows(vectors)
+    weights = exact_similarity(vectors, norms, pairs[:, 0], pairs[:, 1])
+    keep = weights > threshold
+    return pairs[keep, 0], pairs[keep, 1], weights[keep]
+
+def ann_similar_pairs(nodes: list[dict] | NodeTable, threshold: float = 0.75, k: int = 10,
+                      vectors: np.ndarray | None = None, index: IVFIndex | None = None,
+                      nprobe: int | None = None) -> list[dict]:
+    # Drop-in for find_similar_pairs when n is too large for an exact search
+    if isinstance(nodes, NodeTable):
+        ids = nodes.ids
+        if vectors is None:
+            vectors = nodes.vectors
+    else:
+        ids = [n["id"] for n in nodes]
+        if vectors is None:
+            vectors = np.array([n["embedding"] for n in nodes])
+    if index is None:
+        index = IVFIndex()
+        index.add(vectors)
+
+    rows, cols, weights = ann_pair_indices(index, vectors, threshold=threshold, k=k, nprobe=nprobe)
+    return [
+        {
+            "source": ids[i],
+            "target": ids[j],
+            "relationship": "semantically similar",
+            "weight": weight
+        }
+        for i, j, weight in zip(rows.tolist(), cols.tolist(), weights.tolist())
+    ]
+
+def measure_recall(index: IVFIndex, vectors: np.ndarray, threshold: float = 0.75, k: int = 10,
+                   nprobe: int | None = None) -> float:
+    # Share of the exact top-k-plus-threshold pairs the index also finds
+    exact_rows, exact_cols, _ = similar_pair_indices(vectors, threshold=threshold, knn=k)
+    approx_rows, approx_cols, _ = ann_pair_indices(index, vectors, threshold=threshold, k=k, nprobe=nprobe)
+    if len(exact_rows) == 0:
+        return 1.0
+
+    exact = set(zip(exact_rows.tolist(), exact_cols.tolist()))
+    approx = set(zip(approx_rows.tolist(), approx_cols.tolist()))
+    recall = len(exact & approx) / len(exact)
+    print(f"ANN recall@{k}: {recall:.3f} ({len(exact & approx)}/{len(exact)} exact pairs found)")
+    return recall
@@ -1,20 +1,28 @@
 import streamlit as st
 import os
-import json
-import tempfile
-from pathlib import Path
 import sys
 
 # Add project root to path so src modules are always findable
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.extractor import load_pdf, chunk_pages
-from src.concepts import extract_all_concepts
-from src.embeddings import generate_embeddings, find_similar_pairs
+from src.extractor import pdf_fingerprint, ingest_pdf_cached
+from src.concepts import plan_extraction
+from src.pipeline import extract_and_embed
+from src.llm_cache import ConceptCache
+from src.embeddings import find_similar_pairs, warm_up_model
+from src.ann import ann_similar_pairs
+from src.resolve import resolve_entities
 from src.graph import build_graph
+from src.graph_store import save_graph_binary
+from src.metrics import ensure_metrics
+from src.search import ConceptSearchIndex
+from src.library import Library
 from src.layout import compute_umap_layout
-from src.visualize import build_plotly_graph, build_plotly_3d_graph
-from src.animate import assign_clusters
+from src.visualize import build_plotly_graph, build_plotly_3d_graph, build_plotly_lod_graph
+from src.lod import LODHierarchy, LOD_MIN_NODES
+from src.clustering import cluster_graph, cluster_count
+
+ANN_MIN_NODES = 5000
 
 # Page config must be first Streamlit command
 st.set_page_config(
@@ -24,6 +32,9 @@ st.set_page_config(
 )
 
 def run_app():
+    # Load the embedding model in the background while the user picks a file
+    warm_up_model()
+    
     # ── Header ───────────────────────────────────────────────────
     st.title("📚 Book Knowledge Graph")
     st.markdown(
@@ -57,13 +68,33 @@ def run_app():
         
         chunk_size = st.slider(
             "Chunk size (tokens)",
-            min_value=500,
-            max_value=2000,
-            value=1000,
-            step=100,
+            min_value=100,
+            max_value=600,
+            value=250,
+            step=50,
             help="Larger chunks = more context per LLM call"
         )
 
+        concurrency = st.slider(
+            "Parallel LLM requests",
+            min_value=1,
+            max_value=32,
+            value=8,
+            help="Chunks sent to the LLM at once — lower this if you hit rate limits"
+        )
+
+        parallel_parsing = st.checkbox(
+            "Parallel PDF parsing",
+            value=True,
+            help="Parse page ranges in worker processes and chunk them as they arrive"
+        )
+
+        add_to_library = st.checkbox(
+            "Add to library",
+            value=False,
+            help="Keep this book as a shard in output/library and link it to books added before"
+        )
+
         view_mode = st.radio(
                         "Visualization mode",
                         ["2D Interactive", "3D Rotating"],
@@ -101,104 +132,165 @@ def run_app():
     # ── Pipeline Execution ────────────────────────────────────────
     if st.button("🚀 Generate Knowledge Graph", type="primary"):
         
-        # Save uploaded file to temp location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(uploaded_file.getvalue())
-            tmp_path = tmp.name
-        
-        try:
-            # Stage 1
-            with st.status("📄 Extracting text from PDF...") as status:
-                pages = load_pdf(tmp_path)
-                st.write(f"✅ Extracted {len(pages)} pages")
-                status.update(label="📄 Text extracted", state="complete")
-            
-            # Stage 2
-            with st.status("✂️ Chunking text...") as status:
-                chunks = chunk_pages(pages, chunk_size=chunk_size)
-                st.write(f"✅ Created {len(chunks)} chunks")
-                status.update(label="✂️ Chunking complete", state="complete")
-            
-            # Stage 3
-            with st.status("🧠 Extracting concepts with AI...") as status:
-                st.write(f"Processing {max_chunks} chunks...")
-                results = extract_all_concepts(chunks, max_chunks=max_chunks)
-                st.write(f"✅ Found {len(results['nodes'])} concepts")
-                st.write(f"✅ Found {len(results['edges'])} relationships")
-                status.update(label="🧠 Concepts extracted", state="complete")
-            
-            # Stage 4
-            with st.status("🔢 Generating embeddings...") as status:
-                nodes_with_embeddings = generate_embeddings(results["nodes"])
-                similar_edges = find_similar_pairs(
-                    nodes_with_embeddings, 
-                    threshold=similarity_threshold
-                )
-                st.write(f"✅ Found {len(similar_edges)} semantic connections")
-                status.update(label="🔢 Embeddings complete", state="complete")
+        # Known books are served from the ingestion cache without touching PyMuPDF
+        pdf_bytes = uploaded_file.getvalue()
+        fingerprint = pdf_fingerprint(pdf_bytes)
+        
+        # Stages 1–2 — pages stream from the parser straight into the chunker
+        with st.status("📄 Extracting and chunking text...") as status:
+            pages, chunks = ingest_pdf_cached(
+                pdf_bytes,
+                fingerprint=fingerprint,
+                chunk_size=chunk_size,
+                overlap=chunk_size * 15 // 100,
+                by_tokens=True,
+                parallel=parallel_parsing
+            )
+            plan = plan_extraction(chunks[:max_chunks])
+            st.write(f"✅ Extracted {len(pages)} pages")
+            st.write(f"✅ Created {len(chunks)} chunks")
+            st.write(
+                f"Planned: {plan['prompt_tokens']:,} prompt tokens over {plan['requests']} calls "
+                f"(at most ${plan['max_cost_usd']:.3f})"
+            )
+            status.update(label="📄 Text extracted and chunked", state="complete")
+        
+        # Stage 3 — concepts are embedded in the background as each chunk returns
+        with st.status("🧠 Extracting concepts with AI...") as status:
+            st.write(f"Processing {max_chunks} chunks...")
+            results = extract_and_embed(
+                chunks,
+                max_chunks=max_chunks,
+                concurrency=concurrency,
+                cache=ConceptCache(),
+                store_path="output/embeddings",
+                as_table=True
+            )
+            st.write(f"✅ Found {len(results['nodes'])} concepts")
+            st.write(f"✅ Found {len(results['edges'])} relationships")
+            status.update(label="🧠 Concepts extracted", state="complete")
+        
+        # Stage 4
+        with st.status("🔢 Linking similar concepts...") as status:
+            nodes_with_embeddings = results["nodes"]
             
-            # Stage 5
-            with st.status("🕸️ Building graph...") as status:
-                G = build_graph(
-                    nodes_with_embeddings,
-                    results["edges"],
-                    similar_edges
-                )
-                status.update(label="🕸️ Graph built", state="complete")
+            # Merge spelling variants before similarity so every later stage sees fewer nodes
+            resolved = resolve_entities(nodes_with_embeddings, results["edges"])
+            st.write(f"✅ Merged {len(nodes_with_embeddings) - len(resolved['nodes'])} duplicate concepts")
+            nodes_with_embeddings = resolved["nodes"]
+            results["edges"] = resolved["edges"]
             
-            # Stage 6
-            with st.status("📐 Computing layout...") as status:
-                pos = compute_umap_layout(G, nodes_with_embeddings)
-                status.update(label="📐 Layout complete", state="complete")
+            # Exact search is fine for one book; past a few thousand concepts switch to the ANN index
+            pair_search = ann_similar_pairs if len(nodes_with_embeddings) > ANN_MIN_NODES else find_similar_pairs
+            similar_edges = pair_search(
+                nodes_with_embeddings, 
+                threshold=similarity_threshold
+            )
+            st.write(f"✅ Found {len(similar_edges)} semantic connections")
+            status.update(label="🔢 Embeddings complete", state="complete")
+        
+        # Stage 5
+        with st.status("🕸️ Building graph...") as status:
+            G = build_graph(
+                nodes_with_embeddings,
+                results["edges"],
+                similar_edges
+            )
+            # PageRank / weighted degree / betweenness, stored on the nodes for every later stage
+            ensure_metrics(G)
+            cluster_graph(G)
+            # Binary copy and search index for the local query service (src/query_service.py)
+            save_graph_binary(G)
+            ConceptSearchIndex.from_graph(nodes_with_embeddings).save()
+            if add_to_library:
+                added = Library().add_book(fingerprint, nodes_with_embeddings, results["edges"], title=uploaded_file.name)
+                st.write(f"✅ Library now holds {added['nodes']} concepts ({added['cross_edges']} cross-book links)")
+            status.update(label="🕸️ Graph built", state="complete")
+        
+        # Stage 6
+        with st.status("📐 Computing layout...") as status:
+            pos = compute_umap_layout(G, nodes_with_embeddings)
+            status.update(label="📐 Layout complete", state="complete")
+        
+        # Stage 7 — Render
+        with st.status("🎨 Rendering visualization...") as status:
             
-            # Stage 7 — Render
-            with st.status("🎨 Rendering visualization...") as status:
-                
-                if view_mode == "3D Rotating":
-                    fig = build_plotly_3d_graph(G, pos)
-                else:
-                    fig = build_plotly_graph(G, pos)
+            lod = None
+            if G.number_of_nodes() > LOD_MIN_NODES:
+                # Large books render the coarse level first; clusters expand on demand below
+                lod = LODHierarchy.build(G, pos)
+                lod.save()
+                # Built once — the explorer below shows it and the download writes it
+                fig = build_plotly_lod_graph(lod.view())
+            elif view_mode == "3D Rotating":
+                fig = build_plotly_3d_graph(G, pos)
+            else:
+                fig = build_plotly_graph(G, pos)
 
-                status.update(label="🎨 Visualization ready", state="complete")
-            
-            # ── Display Results ───────────────────────────────────
-            st.success("✅ Knowledge graph generated successfully!")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Concepts", G.number_of_nodes())
-            with col2:
-                st.metric("Relationships", G.number_of_edges())
-            with col3:
-                # Count clusters
-                from src.animate import assign_clusters
-                clusters = assign_clusters(G)
-                unique_clusters = len(set(v["cluster_id"] for v in clusters.values()))
-                st.metric("Clusters", unique_clusters)
-            
-            # Display interactive graph
+            st.session_state["lod"] = lod
+            st.session_state["lod_expanded"] = []
+            st.session_state["lod_figure"] = ((), fig) if lod is not None else None
+            status.update(label="🎨 Visualization ready", state="complete")
+        
+        # ── Display Results ───────────────────────────────────
+        st.success("✅ Knowledge graph generated successfully!")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Concepts", G.number_of_nodes())
+        with col2:
+            st.metric("Relationships", G.number_of_edges())
+        with col3:
+            # Clusters were computed once with the graph and stored on its nodes
+            st.metric("Clusters", cluster_count(G))
+        
+        # Display interactive graph — the level-of-detail view is drawn in the explorer below
+        if lod is None:
             st.plotly_chart(fig, use_container_width=True)
-            
-            # Download button
-            html_path = "output/knowledge_graph.html"
+        
+        # Download button
+        html_path = "output/knowledge_graph.html"
 
-            if view_mode == "3D Rotating":
-                build_plotly_3d_graph(G, pos, html_path)
-            else:
-                build_plotly_graph(G, pos, html_path)
+        if lod is not None:
+            fig.write_html(html_path)
+        elif view_mode == "3D Rotating":
+            build_plotly_3d_graph(G, pos, html_path)
+        else:
+            build_plotly_graph(G, pos, html_path)
 
-            with open(html_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-            
-            st.download_button(
-                label="⬇️ Download Interactive Graph",
-                data=html_content,
-                file_name=f"{uploaded_file.name}_knowledge_graph.html",
-                mime="text/html"
-            )
-            
-        finally:
-            os.unlink(tmp_path)
+        with open(html_path, "r", encoding="utf-8") as f:
+            html_content = f.read()
+        
+        st.download_button(
+            label="⬇️ Download Interactive Graph",
+            data=html_content,
+            file_name=f"{uploaded_file.name}_knowledge_graph.html",
+            mime="text/html"
+        )
+
+    # ── Level-of-detail explorer ──────────────────────────────────
+    # Outside the button block so expanding a cluster reruns only this view
+    lod = st.session_state.get("lod")
+    if lod is not None:
+        st.subheader("🔍 Explore clusters")
+        expanded = st.session_state.get("lod_expanded", [])
+        view = lod.view(expanded)
+        # Rebuild the figure only when the expansion changed, not on every rerun
+        key = tuple(sorted(expanded))
+        cached = st.session_state.get("lod_figure")
+        if cached is None or cached[0] != key:
+            cached = (key, build_plotly_lod_graph(view))
+            st.session_state["lod_figure"] = cached
+        options = sorted(set(expanded) | {node["key"] for node in view["nodes"] if node["level"] > 0})
+        st.multiselect(
+            "Expand clusters",
+            options,
+            key="lod_expanded",
+            format_func=lod.label,
+            help="Each selected cluster is replaced by the groups or concepts it contains"
+        )
+        st.caption(f"Showing {len(view['nodes'])} nodes and {len(view['edges'])} links")
+        st.plotly_chart(cached[1], use_container_width=True)
 
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
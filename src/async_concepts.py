@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+from src.backends import LiveBackend
+from src.concepts import MAX_TOKENS, build_messages, parse_response, merge_results, count_prompt_tokens, get_backend
+
+# Status codes worth retrying — rate limits and transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+def estimate_tokens(chunk: str, prompt_tokens: int | None = None) -> int:
+    # Prompt size plus the output budget we reserve — rate limits count both
+    if prompt_tokens is None:
+        prompt_tokens = count_prompt_tokens(chunk)
+    return prompt_tokens + MAX_TOKENS
+
+class RateLimiter:
+    # Two token buckets — requests/min and tokens/min — refilled continuously.
+    # The effective rate is scaled down on every throttle (multiplicative
+    # decrease) and recovers slowly on success (additive increase).
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200_000):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.scale = 1.0
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute * self.scale / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute * self.scale / 60)
+
+    async def acquire(self, tokens: int):
+        # A single request can never need more than a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+
+        # Holding the lock while waiting keeps callers first-come first-served
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+
+                wait_requests = (1 - self._requests) * 60 / (self.requests_per_minute * self.scale)
+                wait_tokens = (tokens - self._tokens) * 60 / (self.tokens_per_minute * self.scale)
+                await asyncio.sleep(max(wait_requests, wait_tokens, 0.01))
+
+    def on_throttle(self):
+        self.scale = max(0.1, self.scale / 2)
+
+    def on_success(self):
+        self.scale = min(1.0, self.scale + 0.05)
+
+def _retry_after(error) -> float | None:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def _backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    # Full jitter — spreads retries out so workers don't hammer in lockstep
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+async def extract_concepts_async(
+    backend,
+    chunk: str,
+    limiter: RateLimiter,
+    semaphore: asyncio.Semaphore,
+    max_retries: int = 6,
+    prompt_tokens: int | None = None
+) -> dict:
+    # Imported here so importing this module doesn't pull in the SDK
+    from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+    tokens = estimate_tokens(chunk, prompt_tokens)
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
+
+        try:
+            async with semaphore:
+                raw = await backend.acomplete(build_messages(chunk), MAX_TOKENS)
+        except APIStatusError as e:
+            if e.status_code not in RETRYABLE_STATUS or attempt == max_retries:
+                raise
+            if e.status_code == 429:
+                limiter.on_throttle()
+            delay = _retry_after(e) or _backoff(attempt)
+            print(f"  HTTP {e.status_code}, retrying in {delay:.1f}s (attempt {attempt+1}/{max_retries})")
+            await asyncio.sleep(delay)
+            continue
+        except (APIConnectionError, APITimeoutError):
+            if attempt == max_retries:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+
+        limiter.on_success()
+        return parse_response(raw)
+
+async def extract_all_concepts_async(
+    chunks: list[dict],
+    max_chunks: int = 50,
+    concurrency: int = 8,
+    requests_per_minute: int = 500,
+    tokens_per_minute: int = 200_000,
+    backend=None,
+    base_url: str | None = None,
+    cache=None,
+    on_result=None
+) -> dict:
+    # base_url points a fresh live backend at another server (e.g. a local mock).
+    # Retries are handled here, so the SDK's own retry loop is switched off.
+    # A backend passed in belongs to the caller and is left open.
+    own_backend = backend is None
+    if own_backend and base_url is not None:
+        from openai import AsyncOpenAI
+        backend = LiveBackend(async_client=AsyncOpenAI(base_url=base_url, max_retries=0))
+    backend = backend or get_backend()
+
+    selected = chunks[:max_chunks]
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [cache.get(chunk["text"]) if cache else None for chunk in selected]
+    pending = [i for i, result in enumerate(results) if result is None]
+    done = 0
+
+    if cache:
+        print(f"{len(selected) - len(pending)}/{len(selected)} chunks served from cache")
+
+    # on_result(chunk_index, result) fires as each chunk lands, in completion order
+    if on_result:
+        for i, result in enumerate(results):
+            if result is not None:
+                on_result(i, result)
+
+    async def worker(i: int, chunk: dict):
+        nonlocal done
+        results[i] = await extract_concepts_async(
+            backend, chunk["text"], limiter, semaphore,
+            prompt_tokens=chunk.get("prompt_tokens")
+        )
+        if cache:
+            cache.put(chunk["text"], results[i])
+        if on_result:
+            on_result(i, results[i])
+        done += 1
+        print(f"Processed chunk {done}/{len(pending)}...")
+
+    try:
+        await asyncio.gather(*(worker(i, selected[i]) for i in pending))
+    finally:
+        # The async client is bound to this event loop, so release it before asyncio.run returns
+        if own_backend and hasattr(backend, "aclose"):
+            await backend.aclose()
+
+    # Results are slotted by chunk index, so dedup sees the same order as the serial path
+    return merge_results(results)
+
+def extract_all_concepts_concurrent(chunks: list[dict], max_chunks: int = 50, concurrency: int = 8, **kwargs) -> dict:
+    return asyncio.run(extract_all_concepts_async(chunks, max_chunks=max_chunks, concurrency=concurrency, **kwargs))
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+# Extraction backends — anything with complete()/acomplete() that turns chat
+# messages into the assistant's reply text. Live talks to OpenAI, Record
+# wraps another backend and logs every exchange, Replay serves a recording
+# back offline so the pipeline can be benchmarked without network or spend.
+
+RECORDINGS_PATH = "output/recordings/llm.jsonl"
+
+def request_key(model: str, messages: list[dict], max_tokens: int) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "max_tokens": max_tokens}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LiveBackend:
+    def __init__(self, client=None, async_client=None, model: str | None = None):
+        from src.concepts import MODEL
+        self.model = model or MODEL
+        self._client = client
+        self._async_client = async_client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from src.concepts import get_client
+            self._client = get_client()
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            from src.concepts import load_env
+            load_env()
+            # Callers own the retry policy, so the SDK's own retries are off
+            self._async_client = AsyncOpenAI(max_retries=0)
+        return self._async_client
+
+    def complete(self, messages: list[dict], max_tokens: int) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=messages
+        )
+        return response.choices[0].message.content
+
+    async def acomplete(self, messages: list[dict], max_tokens: int) -> str:
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=messages
+        )
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+class RecordBackend:
+    def __init__(self, inner, path: str = RECORDINGS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.inner = inner
+        self.model = inner.model
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, messages: list[dict], max_tokens: int, content: str, latency: float):
+        entry = {
+            "key": request_key(self.model, messages, max_tokens),
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "content": content,
+            "latency": latency
+        }
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def complete(self, messages: list[dict], max_tokens: int) -> str:
+        started = time.perf_counter()
+        content = self.inner.complete(messages, max_tokens)
+        self._record(messages, max_tokens, content, time.perf_counter() - started)
+        return content
+
+    async def acomplete(self, messages: list[dict], max_tokens: int) -> str:
+        started = time.perf_counter()
+        content = await self.inner.acomplete(messages, max_tokens)
+        self._record(messages, max_tokens, content, time.perf_counter() - started)
+        return content
+
+    async def aclose(self):
+        if hasattr(self.inner, "aclose"):
+            await self.inner.aclose()
+
+class ReplayBackend:
+    # latency=None replays each response's recorded latency (times
+    # latency_scale); a number simulates a fixed latency instead. jitter adds
+    # up to that fraction of random extra delay.
+    def __init__(self, path: str = RECORDINGS_PATH, latency: float | None = None,
+                 latency_scale: float = 1.0, jitter: float = 0.0, seed: int = 42):
+        from src.concepts import MODEL
+        self.model = MODEL
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self.recordings = {}
+
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]] = entry
+
+        print(f"Loaded {len(self.recordings)} recorded responses from {path}")
+
+    def _lookup(self, messages: list[dict], max_tokens: int) -> tuple[str, float]:
+        key = request_key(self.model, messages, max_tokens)
+        if key not in self.recordings:
+            raise KeyError(f"No recorded response for request {key[:12]} — re-record with RecordBackend")
+        entry = self.recordings[key]
+
+        delay = entry["latency"] * self.latency_scale if self.latency is None else self.latency
+        delay *= 1 + self._random.uniform(0, self.jitter)
+        return entry["content"], delay
+
+    def complete(self, messages: list[dict], max_tokens: int) -> str:
+        content, delay = self._lookup(messages, max_tokens)
+        time.sleep(delay)
+        return content
+
+    async def acomplete(self, messages: list[dict], max_tokens: int) -> str:
+        content, delay = self._lookup(messages, max_tokens)
+        await asyncio.sleep(delay)
+        return content
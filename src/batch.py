@@ -0,0 +1,171 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from src.concepts import MODEL, MAX_TOKENS, build_messages, parse_response, merge_results
+
+# Offline bulk extraction through the Batch API — one JSONL file of chat
+# completion requests per run, submitted once and collected when done.
+
+BATCH_DIR = "output/batches"
+ENDPOINT = "/v1/chat/completions"
+FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+def write_batch_file(chunks: list[dict], path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for chunk in chunks:
+            request = {
+                "custom_id": f"chunk-{chunk['chunk_index']}",
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {
+                    "model": MODEL,
+                    "max_tokens": MAX_TOKENS,
+                    "messages": build_messages(chunk["text"])
+                }
+            }
+            f.write(json.dumps(request) + "\n")
+    return path
+
+class OpenAIBatchClient:
+    def __init__(self, client=None):
+        if client is None:
+            from src.concepts import get_client
+            client = get_client()
+        self.client = client
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=ENDPOINT,
+            completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text = self.client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in text.splitlines() if line.strip())
+        return lines
+
+class LocalBatchClient:
+    # File-based stand-in for the Batch API. Each batch is a directory with
+    # input.jsonl and, once processed, output.jsonl in the same line format
+    # the real endpoint returns. `responder` turns a request's messages into
+    # the assistant's reply text, so no network is involved — any extraction
+    # backend (e.g. ReplayBackend) can be passed in its place.
+    def __init__(self, responder, root: str = os.path.join(BATCH_DIR, "local")):
+        if hasattr(responder, "complete"):
+            backend = responder
+            responder = lambda messages: backend.complete(messages, MAX_TOKENS)
+        self.responder = responder
+        self.root = root
+
+    def submit(self, path: str) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.root, batch_id))
+        shutil.copy(path, os.path.join(self.root, batch_id, "input.jsonl"))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        output_path = os.path.join(self.root, batch_id, "output.jsonl")
+        if not os.path.exists(output_path):
+            self._process(batch_id)
+        return "completed"
+
+    def _process(self, batch_id: str):
+        batch_dir = os.path.join(self.root, batch_id)
+        with open(os.path.join(batch_dir, "input.jsonl")) as f_in, \
+             open(os.path.join(batch_dir, "output.jsonl"), "w") as f_out:
+            for line in f_in:
+                request = json.loads(line)
+                try:
+                    content = self.responder(request["body"]["messages"])
+                    record = {
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                        },
+                        "error": None
+                    }
+                except Exception as e:
+                    record = {
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"message": str(e)}
+                    }
+                f_out.write(json.dumps(record) + "\n")
+
+    def results(self, batch_id: str) -> list[dict]:
+        with open(os.path.join(self.root, batch_id, "output.jsonl")) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+def wait_for_batch(batch_client, batch_id: str, poll_interval: float = 60.0, timeout: float | None = None) -> str:
+    started = time.monotonic()
+    while True:
+        status = batch_client.status(batch_id)
+        if status in FINAL_STATES:
+            return status
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still '{status}' after {timeout:.0f}s")
+        print(f"Batch {batch_id}: {status}, checking again in {poll_interval:.0f}s...")
+        time.sleep(poll_interval)
+
+def parse_batch_results(lines: list[dict]) -> dict[int, dict]:
+    parsed = {}
+    for line in lines:
+        index = int(line["custom_id"].removeprefix("chunk-"))
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            print(f"  chunk {index} failed in batch: {line.get('error') or response.get('status_code')}")
+            continue
+        raw = response["body"]["choices"][0]["message"]["content"]
+        parsed[index] = parse_response(raw)
+    return parsed
+
+def extract_all_concepts_batch(
+    chunks: list[dict],
+    batch_client,
+    max_chunks: int | None = None,
+    poll_interval: float = 60.0,
+    timeout: float | None = None,
+    batch_id: str | None = None,
+    work_dir: str = BATCH_DIR,
+    cache=None
+) -> dict:
+    selected = chunks[:max_chunks]
+    results = {c["chunk_index"]: cache.get(c["text"]) if cache else None for c in selected}
+    pending = [c for c in selected if results[c["chunk_index"]] is None]
+
+    # Pass batch_id to resume collecting a batch submitted by an earlier run
+    if pending and batch_id is None:
+        path = write_batch_file(pending, os.path.join(work_dir, f"requests_{int(time.time())}.jsonl"))
+        batch_id = batch_client.submit(path)
+        print(f"Submitted batch {batch_id} with {len(pending)} chunks ({len(selected) - len(pending)} cached)")
+
+    if batch_id is not None:
+        status = wait_for_batch(batch_client, batch_id, poll_interval=poll_interval, timeout=timeout)
+        if status != "completed":
+            print(f"Batch {batch_id} ended as '{status}' — collecting partial results")
+
+        parsed = parse_batch_results(batch_client.results(batch_id))
+        for chunk in pending:
+            result = parsed.get(chunk["chunk_index"])
+            if result is not None and cache:
+                cache.put(chunk["text"], result)
+            results[chunk["chunk_index"]] = result
+
+    # Failed requests contribute nothing, same as an unparseable response
+    empty = {"nodes": [], "edges": []}
+    return merge_results([results[c["chunk_index"]] or empty for c in selected])
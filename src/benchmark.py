@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import time
+
+# Sys path so `python src/benchmark.py` works from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backends import ReplayBackend, RECORDINGS_PATH
+from src.async_concepts import extract_all_concepts_concurrent
+
+# Offline extraction benchmark. Record a run once with RecordBackend, then
+# replay it here at several concurrency levels to see how throughput scales.
+
+def benchmark_extraction(chunks: list[dict], backend, concurrency_levels=(1, 4, 8, 16), max_chunks: int = 50) -> list[dict]:
+    rows = []
+    for concurrency in concurrency_levels:
+        started = time.perf_counter()
+        results = extract_all_concepts_concurrent(
+            chunks,
+            max_chunks=max_chunks,
+            concurrency=concurrency,
+            backend=backend
+        )
+        elapsed = time.perf_counter() - started
+        processed = min(max_chunks, len(chunks))
+        rows.append({
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "chunks_per_second": processed / elapsed if elapsed else float("inf"),
+            "nodes": len(results["nodes"])
+        })
+
+    print(f"\n{'concurrency':>11}  {'seconds':>8}  {'chunks/s':>8}  {'nodes':>6}")
+    for row in rows:
+        print(f"{row['concurrency']:>11}  {row['seconds']:>8.2f}  {row['chunks_per_second']:>8.2f}  {row['nodes']:>6}")
+    return rows
+
+if __name__ == "__main__":
+    # Usage: python src/benchmark.py <chunks.json> [recordings.jsonl] [latency_scale]
+    with open(sys.argv[1], "r") as f:
+        chunks = json.load(f)
+    recordings = sys.argv[2] if len(sys.argv) > 2 else RECORDINGS_PATH
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    backend = ReplayBackend(recordings, latency_scale=scale)
+    benchmark_extraction(chunks, backend, max_chunks=len(chunks))
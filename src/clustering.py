@@ -0,0 +1,67 @@
+import time
+import networkx as nx
+from src.graph import graph_fingerprint
+
+# Community detection, run once per graph version. The result is stored as a
+# "cluster" node attribute (so it's saved with the graph, JSON or binary) and
+# stamped with the graph fingerprint; later calls on the same graph — or a
+# reloaded copy of it — just read the attribute back.
+#   louvain            — weighted modularity, fast and close to greedy's quality (default)
+#   label_propagation  — fastest, for very large graphs
+#   greedy             — the original greedy modularity, slowest
+
+CLUSTER_METHOD = "louvain"
+
+def _communities(G: nx.Graph, method: str, seed: int) -> list[set]:
+    from networkx.algorithms import community
+    if method == "louvain":
+        return community.louvain_communities(G, weight="weight", seed=seed)
+    if method == "label_propagation":
+        return list(community.fast_label_propagation_communities(G, weight="weight", seed=seed))
+    if method == "greedy":
+        return community.greedy_modularity_communities(G)
+    raise ValueError(f"Unknown clustering method '{method}', expected louvain, label_propagation or greedy")
+
+def cluster_graph(G: nx.Graph, method: str = CLUSTER_METHOD, seed: int = 42) -> dict:
+    # Returns node → cluster id; ids are ordered by community size, largest first
+    stamp = f"{graph_fingerprint(G)}:{method}:{seed}"
+    if G.graph.get("clusters_fingerprint") == stamp:
+        return dict(G.nodes(data="cluster"))
+
+    started = time.perf_counter()
+    communities = sorted(_communities(G, method, seed), key=lambda c: (-len(c), min(map(str, c))))
+    node_cluster = {node: i for i, comm in enumerate(communities) for node in comm}
+    nx.set_node_attributes(G, node_cluster, "cluster")
+    G.graph["clusters_fingerprint"] = stamp
+    print(f"Clustered {G.number_of_nodes()} nodes into {len(communities)} communities "
+          f"with {method} in {time.perf_counter() - started:.2f}s")
+    return node_cluster
+
+def recluster(G: nx.Graph, touched: set, method: str = CLUSTER_METHOD, seed: int = 42) -> dict:
+    # After an in-place merge: communities never span components, so only the
+    # components holding a touched node are re-detected; the rest keep theirs
+    # and every id is renumbered by size as cluster_graph would
+    if any("cluster" not in data for node, data in G.nodes(data=True) if node not in touched):
+        return cluster_graph(G, method, seed)
+
+    started = time.perf_counter()
+    affected = set()
+    for node in touched:
+        if node not in affected:
+            affected |= nx.node_connected_component(G, node)
+    kept = {}
+    for node, cluster in G.nodes(data="cluster"):
+        if node not in affected:
+            kept.setdefault(cluster, set()).add(node)
+
+    communities = list(kept.values()) + list(_communities(G.subgraph(affected), method, seed))
+    communities.sort(key=lambda c: (-len(c), min(map(str, c))))
+    node_cluster = {node: i for i, comm in enumerate(communities) for node in comm}
+    nx.set_node_attributes(G, node_cluster, "cluster")
+    G.graph["clusters_fingerprint"] = f"{graph_fingerprint(G)}:{method}:{seed}"
+    print(f"Re-clustered {len(affected)} of {G.number_of_nodes()} nodes, {len(communities)} communities "
+          f"with {method} in {time.perf_counter() - started:.2f}s")
+    return node_cluster
+
+def cluster_count(G: nx.Graph) -> int:
+    return len(set(cluster_graph(G).values()))
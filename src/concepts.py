@@ -1,11 +1,32 @@
-from openai import OpenAI
 import json
 import re
-from dotenv import load_dotenv
+import threading
+from src.tokens import count_message_tokens
+from src.backends import LiveBackend
 
-load_dotenv()
+# The OpenAI client is built on first use rather than at import, so importing
+# this module (e.g. on every Streamlit rerun) costs nothing. Module globals
+# live for the whole process, so every rerun and session shares one client.
+_client = None
+_env_loaded = False
+_client_lock = threading.Lock()
 
-client = OpenAI()
+def load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                load_env()
+                _client = OpenAI()
+    return _client
 
 SYSTEM_PROMPT = """
 You are a knowledge graph extractor. Given a passage of text, extract the key concepts and relationships.
@@ -28,17 +49,58 @@ Output format:
 }
 """
 
-def extract_concepts(chunk: str) -> dict:
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # Cost efficient for development
-        max_tokens=1024,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"Extract concepts from this text:\n\n{chunk}"}
-        ]
-    )
-    
-    raw = response.choices[0].message.content
+MODEL = "gpt-4o-mini"  # Cost efficient for development
+MAX_TOKENS = 1024
+
+def build_messages(chunk: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Extract concepts from this text:\n\n{chunk}"}
+    ]
+
+def count_prompt_tokens(chunk: str) -> int:
+    return count_message_tokens(build_messages(chunk), MODEL)
+
+def plan_extraction(
+    chunks: list[dict],
+    requests_per_minute: int = 500,
+    tokens_per_minute: int = 200_000,
+    input_cost_per_million: float = 0.15,
+    output_cost_per_million: float = 0.60
+) -> dict:
+    # Annotates each chunk with its prompt size and estimates the run up front.
+    # Output is budgeted at MAX_TOKENS per call, so cost and time are upper bounds.
+    for chunk in chunks:
+        chunk["prompt_tokens"] = count_prompt_tokens(chunk["text"])
+
+    prompt_tokens = sum(c["prompt_tokens"] for c in chunks)
+    output_tokens = MAX_TOKENS * len(chunks)
+    minutes = max(len(chunks) / requests_per_minute, (prompt_tokens + output_tokens) / tokens_per_minute)
+
+    return {
+        "requests": len(chunks),
+        "prompt_tokens": prompt_tokens,
+        "max_output_tokens": output_tokens,
+        "max_cost_usd": (prompt_tokens * input_cost_per_million + output_tokens * output_cost_per_million) / 1_000_000,
+        "min_minutes": minutes
+    }
+
+_default_backend = None
+
+def get_backend():
+    # Live OpenAI backend unless set_backend swapped in a record/replay one
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = LiveBackend()
+    return _default_backend
+
+def set_backend(backend):
+    global _default_backend
+    _default_backend = backend
+
+def extract_concepts(chunk: str, backend=None) -> dict:
+    backend = backend or get_backend()
+    raw = backend.complete(build_messages(chunk), MAX_TOKENS)
     return parse_response(raw)
 
 def parse_response(raw: str) -> dict:
@@ -63,15 +125,12 @@ def deduplicate_nodes(nodes: list[dict]) -> list[dict]:
             seen[key] = node
     return list(seen.values())
 
-def extract_all_concepts(chunks: list[dict], max_chunks: int = 50) -> dict:
+def merge_results(results: list[dict]) -> dict:
+    # Results must arrive in chunk order — dedup keeps the first spelling seen
     all_nodes = []
     all_edges = []
     
-    selected = chunks[:max_chunks]
-    
-    for i, chunk in enumerate(selected):
-        print(f"Processing chunk {i+1}/{len(selected)}...")
-        result = extract_concepts(chunk["text"])
+    for result in results:
         all_nodes.extend(result["nodes"])
         all_edges.extend(result["edges"])
     
@@ -85,6 +144,23 @@ def extract_all_concepts(chunks: list[dict], max_chunks: int = 50) -> dict:
         "edges": all_edges
     }
 
+def extract_all_concepts(chunks: list[dict], max_chunks: int = 50, cache=None, backend=None) -> dict:
+    # cache is an optional ConceptCache — only chunks it hasn't seen cost an API call
+    results = []
+    
+    selected = chunks[:max_chunks]
+    
+    for i, chunk in enumerate(selected):
+        result = cache.get(chunk["text"]) if cache else None
+        if result is None:
+            print(f"Processing chunk {i+1}/{len(selected)}...")
+            result = extract_concepts(chunk["text"], backend)
+            if cache:
+                cache.put(chunk["text"], result)
+        results.append(result)
+    
+    return merge_results(results)
+
 # we shouldn't re-run 50 API calls every time we restart the script during development. We need to cache the results to a JSON file.
 
 import os
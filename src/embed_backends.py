@@ -0,0 +1,142 @@
+import atexit
+import copy
+import platform
+import threading
+import time
+import numpy as np
+from src.embeddings import MODEL_NAME, get_model
+
+# CPU embedding backends for when encoding is the main local cost:
+#   torch      — the reference SentenceTransformer (embeddings.get_model)
+#   int8       — the same model with Linear layers dynamically quantized to int8
+#   onnx       — ONNX Runtime export (needs `optimum[onnxruntime]`)
+#   onnx-int8  — a pre-quantized ONNX file shipped with the model, picked for this CPU
+# Any of them can shard texts across a multi-process encode pool.
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+# The model ships one int8 ONNX file per instruction set; the VNNI/AVX512 ones
+# don't run on CPUs without those extensions. Set ONNX_INT8_FILE to override detection.
+ONNX_INT8_FILES = {
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "avx512f": "onnx/model_qint8_avx512.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",
+    "arm64": "onnx/model_qint8_arm64.onnx"
+}
+ONNX_PORTABLE_FILE = "onnx/model_quantized.onnx"
+ONNX_INT8_FILE = None
+
+_models = {}
+_pools = {}
+_lock = threading.Lock()
+
+def onnx_int8_file() -> str:
+    if ONNX_INT8_FILE:
+        return ONNX_INT8_FILE
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return ONNX_INT8_FILES["arm64"]
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = set(next((line for line in f if line.startswith("flags")), "").split())
+    except OSError:
+        flags = set()  # not Linux — no way to tell, use the portable file
+    for flag in ("avx512_vnni", "avx512f", "avx2"):
+        if flag in flags:
+            return ONNX_INT8_FILES[flag]
+    return ONNX_PORTABLE_FILE
+
+def get_backend_model(backend: str = "torch"):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {BACKENDS}")
+    if backend == "torch":
+        return get_model()
+
+    with _lock:
+        if backend not in _models:
+            if backend == "int8":
+                import torch
+                # Quantize a copy so the reference model stays untouched for comparisons
+                _models[backend] = torch.quantization.quantize_dynamic(
+                    copy.deepcopy(get_model()), {torch.nn.Linear}, dtype=torch.qint8
+                )
+            else:
+                from sentence_transformers import SentenceTransformer
+                model_kwargs = {"file_name": onnx_int8_file()} if backend == "onnx-int8" else None
+                _models[backend] = SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs=model_kwargs)
+    return _models[backend]
+
+def _get_pool(backend: str, processes: int):
+    # Worker processes each load their own model copy, so pools are kept for reuse
+    if backend == "int8":
+        # Quantized modules don't pickle cleanly into workers
+        raise ValueError("The int8 backend runs in-process only; use processes=1")
+
+    key = (backend, processes)
+    model = get_backend_model(backend)
+    with _lock:
+        if key not in _pools:
+            _pools[key] = (model, model.start_multi_process_pool(["cpu"] * processes))
+    return _pools[key]
+
+@atexit.register
+def stop_pools():
+    with _lock:
+        for model, pool in _pools.values():
+            model.stop_multi_process_pool(pool)
+        _pools.clear()
+
+def pool_processes(count: int, processes: int, batch_size: int) -> int:
+    # A pool only pays off with a full batch per worker — smaller inputs run in-process
+    return processes if processes > 1 and count >= processes * batch_size else 1
+
+def encode_texts(texts: list[str], backend: str = "torch", processes: int = 1, batch_size: int = 64) -> np.ndarray:
+    processes = pool_processes(len(texts), processes, batch_size)
+    if processes > 1:
+        model, pool = _get_pool(backend, processes)
+        return np.asarray(model.encode(texts, pool=pool, batch_size=batch_size,
+                                       chunk_size=max(batch_size, len(texts) // (processes * 4))))
+
+    model = get_backend_model(backend)
+    return np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=len(texts) > 1000))
+
+def compare_backends(texts: list[str], backends=BACKENDS, processes_options=(1,), batch_size: int = 64) -> list[dict]:
+    # Throughput and cosine drift of each backend against the torch reference
+    reference = encode_texts(texts, "torch", processes=1, batch_size=batch_size)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+    rows = []
+    for backend in backends:
+        for requested in processes_options:
+            # Report the process count that actually ran, not the one asked for
+            processes = pool_processes(len(texts), requested, batch_size)
+            try:
+                encode_texts(texts[:batch_size], backend, processes=1, batch_size=batch_size)  # warm-up / load
+                started = time.perf_counter()
+                vectors = encode_texts(texts, backend, processes=processes, batch_size=batch_size)
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                rows.append({"backend": backend, "processes": processes, "requested_processes": requested, "error": str(e)})
+                continue
+
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            cosine = np.einsum("ij,ij->i", vectors, reference)
+            rows.append({
+                "backend": backend,
+                "processes": processes,
+                "requested_processes": requested,
+                "texts_per_second": len(texts) / elapsed,
+                "mean_cosine": float(cosine.mean()),
+                "min_cosine": float(cosine.min())
+            })
+
+    print(f"\n{'backend':>10}  {'procs':>5}  {'texts/s':>9}  {'mean cos':>8}  {'min cos':>8}")
+    for row in rows:
+        procs = f"{row['processes']}" if row["processes"] == row["requested_processes"] else f"{row['processes']}*"
+        if "error" in row:
+            print(f"{row['backend']:>10}  {procs:>5}  unavailable — {row['error']}")
+        else:
+            print(f"{row['backend']:>10}  {procs:>5}  {row['texts_per_second']:>9.1f}  "
+                  f"{row['mean_cosine']:>8.4f}  {row['min_cosine']:>8.4f}")
+    if any(row["processes"] != row["requested_processes"] for row in rows):
+        print(f"* too few texts for the requested pool ({batch_size} per process needed), ran in-process")
+    return rows
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import numpy as np
+from src.embeddings import MODEL_NAME, embedding_text, get_model
+
+# Binary embedding store — a raw float32 (or float16) matrix in .npy format
+# that loads memory-mapped, plus a small JSON index of node ids and the hash
+# of the text each row was encoded from. Rows are reused by text hash, so
+# concepts whose id and description haven't changed are never re-encoded.
+
+STORE_PATH = "output/embeddings"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def save_embedding_store(ids: list[str], hashes: list[str], vectors: np.ndarray,
+                         path: str = STORE_PATH, dtype: str = "float32"):
+    os.makedirs(path, exist_ok=True)
+    vectors = np.ascontiguousarray(vectors, dtype=dtype)
+
+    # Write both files under temp names first — a reader never sees a mismatched pair
+    matrix_tmp = os.path.join(path, "vectors.tmp.npy")
+    index_tmp = os.path.join(path, "index.tmp.json")
+    np.save(matrix_tmp, vectors)
+    with open(index_tmp, "w") as f:
+        json.dump({
+            "model": MODEL_NAME,
+            "dtype": dtype,
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "ids": ids,
+            "hashes": hashes
+        }, f)
+    os.replace(matrix_tmp, os.path.join(path, "vectors.npy"))
+    os.replace(index_tmp, os.path.join(path, "index.json"))
+    print(f"Embedding store saved to {path} ({len(ids)} × {vectors.shape[1] if vectors.ndim == 2 else 0} {dtype})")
+
+def merge_embedding_store(ids: list[str], hashes: list[str], vectors: np.ndarray,
+                          path: str = STORE_PATH, dtype: str = "float32"):
+    # Appends rows for texts the store hasn't seen and keeps every existing row, so
+    # vectors from earlier runs, other books or a larger max_chunks stay reusable.
+    # The store is only replaced wholesale when it was built with another model.
+    vectors = np.asarray(vectors, dtype=dtype)
+    if store_exists(path):
+        store = load_embedding_store(path, mmap=False)
+        old = store["vectors"]
+        if store["model"] == MODEL_NAME and old.ndim == 2 and old.shape[1] == vectors.shape[1]:
+            seen = set(store["hashes"])
+            new = []
+            for i, h in enumerate(hashes):
+                if h not in seen:
+                    seen.add(h)
+                    new.append(i)
+            if not new:
+                return
+            ids = store["ids"] + [ids[i] for i in new]
+            hashes = store["hashes"] + [hashes[i] for i in new]
+            vectors = np.concatenate([old.astype(dtype, copy=False), vectors[new]])
+    save_embedding_store(ids, hashes, vectors, path=path, dtype=dtype)
+
+def load_embedding_store(path: str = STORE_PATH, mmap: bool = True) -> dict:
+    with open(os.path.join(path, "index.json"), "r") as f:
+        index = json.load(f)
+
+    # mmap_mode='r' maps the file instead of reading it — pages load on touch
+    vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+    return {
+        "ids": index["ids"],
+        "hashes": index["hashes"],
+        "model": index["model"],
+        "vectors": vectors
+    }
+
+def store_exists(path: str = STORE_PATH) -> bool:
+    return os.path.exists(os.path.join(path, "index.json")) and os.path.exists(os.path.join(path, "vectors.npy"))
+
+def embed_with_store(nodes: list[dict], path: str = STORE_PATH, dtype: str = "float32") -> np.ndarray:
+    # Returns a matrix aligned with `nodes`, encoding only texts the store hasn't seen
+    if not nodes:
+        return np.empty((0, 0), dtype=np.float32)
+
+    texts = [embedding_text(n) for n in nodes]
+    hashes = [text_hash(t) for t in texts]
+
+    store = None
+    known = {}
+    if store_exists(path):
+        store = load_embedding_store(path)
+        if store["model"] == MODEL_NAME:
+            known = {h: i for i, h in enumerate(store["hashes"])}
+
+    missing = [i for i, h in enumerate(hashes) if h not in known]
+    print(f"Embedding store: reusing {len(nodes) - len(missing)}, encoding {len(missing)}")
+
+    dim = get_model().get_sentence_embedding_dimension() if missing else store["vectors"].shape[1]
+    vectors = np.empty((len(nodes), dim), dtype=np.float32)
+    reused = [i for i, h in enumerate(hashes) if h in known]
+    if reused:
+        vectors[reused] = store["vectors"][[known[hashes[i]] for i in reused]]
+    if missing:
+        vectors[missing] = get_model().encode([texts[i] for i in missing], show_progress_bar=True)
+
+    # Reused rows are copied out of the map above, so the old files can be replaced
+    store = None
+    if missing:
+        merge_embedding_store([nodes[i]["id"] for i in missing], [hashes[i] for i in missing],
+                              vectors[missing], path=path, dtype=dtype)
+    return vectors
@@ -1,41 +1,218 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import json
 import os
+import threading
+from src.node_table import NodeTable
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
 
-def generate_embeddings(nodes: list[dict]) -> list[dict]:
-    texts = [f"{n['id']}: {n['description']}" for n in nodes]
+# Loaded on first use instead of at import — the model (and torch behind it)
+# is the slowest thing the app touches. Module globals live for the whole
+# process, so one copy is shared by every Streamlit rerun and session.
+_model = None
+_model_lock = threading.Lock()
+_warm_up_lock = threading.Lock()  # separate from _model_lock, which is held for the whole load
+_warm_up_thread = None
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def warm_up_model() -> threading.Thread | None:
+    # Starts loading the model in the background; safe to call on every rerun
+    # and never waits for a load already in progress
+    global _warm_up_thread
+    if _model is not None:
+        return None
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=get_model, name="embedding-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+def embedding_text(node: dict) -> str:
+    return f"{node['id']}: {node['description']}"
+
+def generate_embeddings(nodes: list[dict] | NodeTable, backend: str = "torch", processes: int = 1,
+                        batch_size: int = 64) -> list[dict] | NodeTable:
+    # A NodeTable gets its vectors as one float32 matrix; dicts still get per-node lists
+    texts = [embedding_text(n) for n in (nodes.records() if isinstance(nodes, NodeTable) else nodes)]
     
     print("Generating embeddings...")
-    vectors = model.encode(texts, show_progress_bar=True)
+    if backend == "torch" and processes == 1:
+        vectors = get_model().encode(texts, batch_size=batch_size, show_progress_bar=True)
+    else:
+        # Quantized/ONNX models and multi-process pools live in embed_backends
+        from src.embed_backends import encode_texts
+        vectors = encode_texts(texts, backend=backend, processes=processes, batch_size=batch_size)
     
+    if isinstance(nodes, NodeTable):
+        nodes.set_vectors(vectors)
+        return nodes
+
     for i, node in enumerate(nodes):
         node["embedding"] = vectors[i].tolist()
     
     return nodes
 
-def find_similar_pairs(nodes: list[dict], threshold: float = 0.75) -> list[dict]:
-    vectors = np.array([n["embedding"] for n in nodes])
-    
-    # Normalize vectors for cosine similarity
-    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
-    normalized = vectors / norms
+def normalize_rows(vectors: np.ndarray, block_rows: int = 8192) -> tuple[np.ndarray, np.ndarray]:
+    # float32 unit vectors for the bulk products, float64 norms for exact rescoring.
+    # Done in row blocks so a mapped float16/float32 store is never copied whole as float64.
+    n = len(vectors)
+    norms = np.empty(n, dtype=np.float64)
+    normalized = np.empty(vectors.shape, dtype=np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, n, block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float64)
+            norms[start:start + block_rows] = np.linalg.norm(block, axis=1)
+            normalized[start:start + block_rows] = block / norms[start:start + block_rows, None]
+    return normalized, norms
+
+def exact_similarity(vectors: np.ndarray, norms: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    # float64 cosine for just these pairs — matches what the old full-matrix path computed
+    a = np.asarray(vectors[rows], dtype=np.float64) / norms[rows, None]
+    b = np.asarray(vectors[cols], dtype=np.float64) / norms[cols, None]
+    return np.einsum("ij,ij->i", a, b)
+
+def similar_pair_indices(
+    vectors: np.ndarray,
+    threshold: float = 0.75,
+    top_k: int | None = None,
+    knn: int | None = None,
+    memory_budget_mb: float = 256
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Each node nominates its k nearest neighbours above the threshold, then:
+    #   top_k  caps every node at top_k pairs — a pair is kept only if both ends nominate it
+    #   knn    kNN graph — the union of nominations, so a node many others pick can end up
+    #          in more than knn pairs (what the ANN index returns, used for recall checks)
+    # Neither keeps every pair above the threshold.
+    if top_k is not None and knn is not None:
+        raise ValueError("Pass top_k (per-node cap) or knn (union of nominations), not both")
+    k_nearest = top_k if top_k is not None else knn
+    n = len(vectors)
+    empty = np.empty(0, dtype=np.int64)
+    if n < 2:
+        return empty, empty, np.empty(0)
+
+    normalized, norms = normalize_rows(vectors)
+
+    # Each block row costs one float32 similarity row plus its boolean mask
+    block_rows = max(1, int(memory_budget_mb * 1024 * 1024 // (5 * n)))
+
+    # float32 products can be off by ~1e-6, so collect candidates with a
+    # margin and decide them on the float64 rescore below
+    candidate_threshold = threshold - 1e-4
+    rows, cols = [], []
+
+    with np.errstate(invalid="ignore"):
+        for start in range(0, n, block_rows):
+            stop = min(start + block_rows, n)
+
+            if k_nearest is None:
+                # Upper triangle only — columns from `start` on, strictly right of the diagonal
+                sims = normalized[start:stop] @ normalized[start:].T
+                r, c = np.nonzero(np.triu(sims > candidate_threshold, k=1))
+                rows.append(r + start)
+                cols.append(c + start)
+            else:
+                # Each node nominates its k nearest neighbours
+                sims = normalized[start:stop] @ normalized.T
+                sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+                k = min(k_nearest, n - 1)
+                best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                best_sims = np.take_along_axis(sims, best, axis=1)
+                r, slot = np.nonzero(best_sims > candidate_threshold)
+                a, b = r + start, best[r, slot]
+                rows.append(np.minimum(a, b))
+                cols.append(np.maximum(a, b))
+
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+
+    if k_nearest is not None and len(rows):
+        # A pair nominated from both ends shows up twice
+        pairs, nominations = np.unique(np.stack([rows, cols], axis=1), axis=0, return_counts=True)
+        if top_k is not None:
+            pairs = pairs[nominations == 2]
+        rows, cols = pairs[:, 0], pairs[:, 1]
+
+    weights = exact_similarity(vectors, norms, rows, cols)
+    keep = weights > threshold
+    return rows[keep], cols[keep], weights[keep]
+
+def cross_similar_pair_indices(
+    new_vectors: np.ndarray,
+    old_vectors: np.ndarray,
+    threshold: float = 0.75,
+    memory_budget_mb: float = 256
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Pairs between two sets — rows index new_vectors, cols index old_vectors.
+    # Used for incremental updates, where only the new × existing block is needed.
+    empty = np.empty(0, dtype=np.int64)
+    if len(new_vectors) == 0 or len(old_vectors) == 0:
+        return empty, empty, np.empty(0)
+
+    new_normalized, new_norms = normalize_rows(new_vectors)
+    old_normalized, old_norms = normalize_rows(old_vectors)
+    block_rows = max(1, int(memory_budget_mb * 1024 * 1024 // (5 * len(old_vectors))))
+
+    rows, cols = [], []
+    with np.errstate(invalid="ignore"):
+        for start in range(0, len(new_vectors), block_rows):
+            sims = new_normalized[start:start + block_rows] @ old_normalized.T
+            r, c = np.nonzero(sims > threshold - 1e-4)
+            rows.append(r + start)
+            cols.append(c)
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+    a = np.asarray(new_vectors[rows], dtype=np.float64) / new_norms[rows, None]
+    b = np.asarray(old_vectors[cols], dtype=np.float64) / old_norms[cols, None]
+    weights = np.einsum("ij,ij->i", a, b)
+    keep = weights > threshold
+    return rows[keep], cols[keep], weights[keep]
+
+def find_similar_pairs(
+    nodes: list[dict] | NodeTable,
+    threshold: float = 0.75,
+    vectors: np.ndarray | None = None,
+    top_k: int | None = None,
+    knn: int | None = None,
+    memory_budget_mb: float = 256
+) -> list[dict]:
+    # vectors (row-aligned with nodes) skips the per-node lists, e.g. a mapped embedding store.
+    # Similarities are computed in float32 row blocks sized to memory_budget_mb
+    # instead of one n×n matrix; top_k caps each node's pairs, knn keeps the union of
+    # nearest-neighbour nominations (see similar_pair_indices).
+    if isinstance(nodes, NodeTable):
+        ids = nodes.ids
+        if vectors is None:
+            vectors = nodes.vectors
+    else:
+        ids = [n["id"] for n in nodes]
+        if vectors is None:
+            vectors = np.array([n["embedding"] for n in nodes])
     
-    # Dot product of normalized vectors = cosine similarity
-    similarity_matrix = np.dot(normalized, normalized.T)
+    rows, cols, weights = similar_pair_indices(
+        vectors,
+        threshold=threshold,
+        top_k=top_k,
+        knn=knn,
+        memory_budget_mb=memory_budget_mb
+    )
     
     similar_edges = []
-    for i in range(len(nodes)):
-        for j in range(i+1, len(nodes)):
-            if similarity_matrix[i][j] > threshold:
-                similar_edges.append({
-                    "source": nodes[i]["id"],
-                    "target": nodes[j]["id"],
-                    "relationship": "semantically similar",
-                    "weight": float(similarity_matrix[i][j])
-                })
+    for i, j, weight in zip(rows.tolist(), cols.tolist(), weights.tolist()):
+        similar_edges.append({
+            "source": ids[i],
+            "target": ids[j],
+            "relationship": "semantically similar",
+            "weight": weight
+        })
     
     return similar_edges
 
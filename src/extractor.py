@@ -1,7 +1,13 @@
 import fitz
+import hashlib
+import json
+import os
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Iterable, Iterator
+from src.tokens import DEFAULT_MODEL, piece_tokens, split_pieces
 
 def clean_text(text: str) -> str:
     text = re.sub(r'-\n', '', text)           # Fix hyphenated line breaks
@@ -31,29 +37,292 @@ def extract_text_from_pdf(pdf_path: str) -> list[dict]:
     doc.close()
     return pages
 
-def load_pdf(pdf_path: str) -> list[dict]:
-    pages = extract_text_from_pdf(pdf_path)
+def _extract_page_range(args: tuple) -> list[dict]:
+    # Runs inside a worker process — each worker opens its own fitz handle
+    # because a Document can't be shared across processes
+    pdf_path, start, end = args
+    doc = fitz.open(pdf_path)
+    pages = []
+
+    for page_num in range(start, end):
+        cleaned = clean_text(doc[page_num].get_text())
+
+        if len(cleaned.strip()) < 50:
+            continue
+
+        pages.append({
+            "page": page_num + 1,
+            "text": cleaned
+        })
+
+    doc.close()
+    return pages
+
+def iter_pages_parallel(pdf_path: str, workers: int | None = None, pages_per_task: int = 25):
+    pdf_path = str(pdf_path)
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    ranges = [
+        (pdf_path, start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, r) for r in ranges]
+
+        # Waiting on futures in submission order keeps pages in book order,
+        # while later ranges keep parsing in the background
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+def iter_pdf_pages(pdf_path: str, parallel: bool = False, workers: int | None = None) -> Iterator[dict]:
+    # Pages in book order; the parallel parser yields each range as soon as it's ready
+    if parallel:
+        yield from iter_pages_parallel(pdf_path, workers=workers)
+    else:
+        yield from extract_text_from_pdf(pdf_path)
+
+def load_pdf(pdf_path: str, parallel: bool = False, workers: int | None = None) -> list[dict]:
+    # Collects every page — ingest_pdf_cached streams them into the chunker instead
+    pages = list(iter_pdf_pages(pdf_path, parallel=parallel, workers=workers))
     print(f"Extracted {len(pages)} pages from {Path(pdf_path).name}")
     return pages
 
 
-def chunk_pages(pages: list[dict], chunk_size: int = 1000, overlap: int = 150) -> list[dict]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        separators=["\n\n", "\n", ". ", " "]
-    )
-    
-    # Join all pages into one continuous text first
-    full_text = " ".join([p["text"] for p in pages])
+# Same separator preference RecursiveCharacterTextSplitter used — coarsest first
+SEPARATORS = ["\n\n", "\n", ". ", " "]
 
-    chunks = splitter.split_text(full_text)
+def _find_split(text: str, chunk_size: int, min_size: int) -> int:
+    window = text[:chunk_size]
+    for sep in SEPARATORS:
+        idx = window.rfind(sep, min_size)
+        if idx != -1:
+            return idx + len(sep)
+    # No separator in range — hard cut
+    return chunk_size
 
-    all_chunks = []
-    for i, chunk in enumerate(chunks):
-        all_chunks.append({
-            "chunk_index": i,
-            "text": chunk
-        })
-    
-    return all_chunks
\ No newline at end of file
+def iter_chunks(pages: Iterable[dict], chunk_size: int = 1000, overlap: int = 150) -> Iterator[dict]:
+    if overlap >= chunk_size:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    # Only a sliding window of text is held — at most one chunk plus the
+    # page currently being consumed — so memory stays flat for any book length
+    buffer = ""
+    starts = []      # (offset in buffer, page number) for every page in the buffer
+    emitted = 0      # buffer[:emitted] already went out in a previous chunk
+    chunk_index = 0
+    min_size = max(overlap + 1, chunk_size // 2)
+
+    def make_chunk(end: int) -> dict:
+        covering = [page for offset, page in starts if offset < end]
+        return {
+            "chunk_index": chunk_index,
+            "text": buffer[:end].strip(),
+            "page_start": covering[0],
+            "page_end": covering[-1]
+        }
+
+    for page in pages:
+        if buffer:
+            buffer += " "
+        starts.append((len(buffer), page["page"]))
+        buffer += page["text"]
+
+        while len(buffer) > chunk_size:
+            cut = _find_split(buffer, chunk_size, min_size)
+            chunk = make_chunk(cut)
+            if chunk["text"]:
+                yield chunk
+                chunk_index += 1
+
+            # Slide the window back by `overlap` characters, snapped to a word start
+            next_start = buffer.find(" ", cut - overlap, cut)
+            next_start = cut - overlap if next_start == -1 else next_start + 1
+
+            buffer = buffer[next_start:]
+            while len(starts) > 1 and starts[1][0] <= next_start:
+                starts.pop(0)
+            starts = [(max(offset - next_start, 0), p) for offset, p in starts]
+            emitted = cut - next_start
+
+    # Flush the tail unless it's nothing but overlap we've already sent
+    if len(buffer) > emitted and buffer.strip():
+        yield make_chunk(len(buffer))
+
+def iter_token_chunks(pages: Iterable[dict], chunk_tokens: int = 250, overlap_tokens: int = 40,
+                      model: str = DEFAULT_MODEL) -> Iterator[dict]:
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError(f"overlap_tokens ({overlap_tokens}) must be smaller than chunk_tokens ({chunk_tokens})")
+
+    # Same sliding window as iter_chunks, but measured in tokenizer counts.
+    # The window holds (piece, tokens, page) entries and a running total, so
+    # each word is counted once however many chunks it overlaps into.
+    window = []
+    total = 0
+    chunk_index = 0
+    emitted = 0  # leading window entries already part of an emitted chunk
+
+    def make_chunk(end: int) -> dict:
+        pieces = window[:end]
+        return {
+            "chunk_index": chunk_index,
+            "text": "".join(p for p, _, _ in pieces).strip(),
+            "page_start": pieces[0][2],
+            "page_end": pieces[-1][2],
+            "tokens": sum(t for _, t, _ in pieces)
+        }
+
+    def split_point() -> int:
+        # Prefer ending on a sentence once the chunk is at least half full
+        running = 0
+        best = len(window)
+        for i, (piece, tokens, _) in enumerate(window):
+            running += tokens
+            if running >= chunk_tokens // 2 and piece.endswith((".", "?", "!")):
+                best = i + 1
+        return best
+
+    for page in pages:
+        for piece in split_pieces(" " + page["text"] if window else page["text"]):
+            tokens = piece_tokens(piece, model)
+
+            if window and total + tokens > chunk_tokens:
+                cut = split_point()
+                yield make_chunk(cut)
+                chunk_index += 1
+
+                # Keep the last `overlap_tokens` worth of the emitted chunk
+                start, kept = cut, 0
+                while start > 1 and kept + window[start - 1][1] <= overlap_tokens:
+                    start -= 1
+                    kept += window[start][1]
+
+                window = window[start:]
+                total = sum(t for _, t, _ in window)
+                emitted = cut - start  # the kept overlap; pieces after the cut were never emitted
+
+            window.append((piece, tokens, page["page"]))
+            total += tokens
+
+    # Flush whatever extends past the last emitted overlap
+    if len(window) > emitted and "".join(p for p, _, _ in window[emitted:]).strip():
+        yield make_chunk(len(window))
+
+def iter_page_chunks(pages: Iterable[dict], chunk_size: int = 1000, overlap: int = 150,
+                     by_tokens: bool = False) -> Iterator[dict]:
+    # by_tokens=True reads chunk_size/overlap as tokenizer tokens instead of characters
+    if by_tokens:
+        return iter_token_chunks(pages, chunk_tokens=chunk_size, overlap_tokens=overlap)
+    return iter_chunks(pages, chunk_size=chunk_size, overlap=overlap)
+
+def chunk_pages(pages: list[dict], chunk_size: int = 1000, overlap: int = 150, by_tokens: bool = False) -> list[dict]:
+    return list(iter_page_chunks(pages, chunk_size=chunk_size, overlap=overlap, by_tokens=by_tokens))
+
+
+# ── Ingestion cache ──────────────────────────────────────────────
+# Pages are keyed by the PDF bytes, chunks additionally by the chunking
+# parameters, so moving the chunk size slider reuses the parsed pages.
+# Bump INGEST_VERSION whenever clean_text or the chunker changes.
+INGEST_VERSION = 2
+INGEST_CACHE_DIR = "output/cache/ingest"
+
+def pdf_fingerprint(pdf_bytes: bytes) -> str:
+    digest = hashlib.sha256(pdf_bytes)
+    digest.update(f"|v{INGEST_VERSION}".encode())
+    return digest.hexdigest()
+
+def _read_cache(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _write_cache(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a crashed run never leaves a half-written entry
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _pages_path(cache_dir: str, fingerprint: str) -> str:
+    return os.path.join(cache_dir, f"{fingerprint}.pages.json")
+
+def _chunks_path(cache_dir: str, fingerprint: str, chunk_size: int, overlap: int, by_tokens: bool) -> str:
+    unit = "tok" if by_tokens else "chr"
+    return os.path.join(cache_dir, f"{fingerprint}.chunks-{unit}-{chunk_size}-{overlap}.json")
+
+def load_pdf_cached(pdf_bytes: bytes, fingerprint: str | None = None, cache_dir: str = INGEST_CACHE_DIR,
+                    parallel: bool = False) -> list[dict]:
+    fingerprint = fingerprint or pdf_fingerprint(pdf_bytes)
+    path = _pages_path(cache_dir, fingerprint)
+
+    pages = _read_cache(path)
+    if pages is not None:
+        print(f"Loaded {len(pages)} pages from ingestion cache")
+        return pages
+
+    # PyMuPDF workers need a real file to open
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(pdf_bytes)
+        tmp_path = tmp.name
+
+    try:
+        pages = load_pdf(tmp_path, parallel=parallel)
+    finally:
+        os.unlink(tmp_path)
+
+    _write_cache(path, pages)
+    return pages
+
+def chunk_pages_cached(pages: list[dict], fingerprint: str, chunk_size: int = 1000, overlap: int = 150,
+                       cache_dir: str = INGEST_CACHE_DIR, by_tokens: bool = False) -> list[dict]:
+    path = _chunks_path(cache_dir, fingerprint, chunk_size, overlap, by_tokens)
+
+    chunks = _read_cache(path)
+    if chunks is not None:
+        print(f"Loaded {len(chunks)} chunks from ingestion cache")
+        return chunks
+
+    chunks = chunk_pages(pages, chunk_size=chunk_size, overlap=overlap, by_tokens=by_tokens)
+    _write_cache(path, chunks)
+    return chunks
+
+def ingest_pdf_cached(pdf_bytes: bytes, fingerprint: str | None = None, chunk_size: int = 1000,
+                      overlap: int = 150, by_tokens: bool = False, parallel: bool = False,
+                      workers: int | None = None, cache_dir: str = INGEST_CACHE_DIR) -> tuple[list[dict], list[dict]]:
+    # (pages, chunks) with both caches filled. On a cold cache pages stream from
+    # the parser straight into the chunker, so chunking overlaps parsing instead
+    # of waiting for the whole book; pages are recorded on the way for the cache.
+    fingerprint = fingerprint or pdf_fingerprint(pdf_bytes)
+    pages = _read_cache(_pages_path(cache_dir, fingerprint))
+    if pages is not None:
+        print(f"Loaded {len(pages)} pages from ingestion cache")
+        return pages, chunk_pages_cached(pages, fingerprint, chunk_size, overlap, cache_dir, by_tokens)
+
+    # PyMuPDF workers need a real file to open
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        tmp.write(pdf_bytes)
+        tmp_path = tmp.name
+
+    pages = []
+    def recorded():
+        for page in iter_pdf_pages(tmp_path, parallel=parallel, workers=workers):
+            pages.append(page)
+            yield page
+
+    try:
+        chunks = list(iter_page_chunks(recorded(), chunk_size=chunk_size, overlap=overlap, by_tokens=by_tokens))
+    finally:
+        os.unlink(tmp_path)
+    print(f"Extracted {len(pages)} pages into {len(chunks)} chunks")
+
+    _write_cache(_pages_path(cache_dir, fingerprint), pages)
+    _write_cache(_chunks_path(cache_dir, fingerprint, chunk_size, overlap, by_tokens), chunks)
+    return pages, chunks
@@ -1,15 +1,23 @@
 import networkx as nx
+import numpy as np
+import hashlib
 import json
 import os
+from src.embeddings import similar_pair_indices, cross_similar_pair_indices
+from src.node_table import NodeTable
 
-def build_graph(nodes: list[dict], llm_edges: list[dict], embedding_edges: list[dict]) -> nx.Graph:
+def build_graph(nodes: list[dict] | NodeTable, llm_edges: list[dict], embedding_edges: list[dict]) -> nx.Graph:
     G = nx.Graph()
     
+    if isinstance(nodes, NodeTable):
+        nodes = nodes.records()
+    
     # Add nodes with all their attributes
     for node in nodes:
         G.add_node(
             node["id"],
             description=node.get("description", ""),
+            aliases=node.get("aliases", []),
             size=1  # We'll update this based on importance
         )
     
@@ -50,9 +58,117 @@ def build_graph(nodes: list[dict], llm_edges: list[dict], embedding_edges: list[
     
     return G
 
+def update_graph(
+    G: nx.Graph,
+    new_nodes: list[dict] | NodeTable,
+    llm_edges: list[dict],
+    existing_nodes: list[dict] | NodeTable,
+    threshold: float = 0.75,
+    new_vectors: np.ndarray | None = None,
+    existing_vectors: np.ndarray | None = None
+) -> dict:
+    # Adds concepts to an existing graph in place. Only the new × new and
+    # new × existing similarity blocks are computed, and only touched nodes
+    # get their size recomputed — cost scales with the update, not the graph.
+    # existing_nodes (with embeddings, or row-aligned existing_vectors) are
+    # the nodes already in G that new concepts may link to.
+    if isinstance(new_nodes, NodeTable):
+        if new_vectors is None:
+            new_vectors = new_nodes.vectors
+        new_nodes = list(new_nodes.records())
+    if isinstance(existing_nodes, NodeTable):
+        existing_ids = existing_nodes.ids
+        if existing_vectors is None:
+            existing_vectors = existing_nodes.vectors
+    else:
+        existing_ids = [n["id"] for n in existing_nodes]
+
+    fresh = [i for i, node in enumerate(new_nodes) if not G.has_node(node["id"])]
+    added = [new_nodes[i] for i in fresh]
+
+    if new_vectors is None:
+        new_vectors = np.array([n["embedding"] for n in added]) if added else np.empty((0, 0))
+    else:
+        new_vectors = np.asarray(new_vectors)[fresh]
+    if existing_vectors is None:
+        existing_vectors = np.array([n["embedding"] for n in existing_nodes]) if existing_nodes else np.empty((0, 0))
+
+    delta = {"added_nodes": [], "added_edges": [], "updated_edges": [], "resized": {}}
+    touched = set()
+
+    for node in added:
+        G.add_node(
+            node["id"],
+            description=node.get("description", ""),
+            aliases=node.get("aliases", []),
+            size=0
+        )
+        delta["added_nodes"].append(node["id"])
+        touched.add(node["id"])
+
+    def record(source, target, attrs):
+        existed = G.has_edge(source, target)
+        G.add_edge(source, target, **attrs)
+        delta["updated_edges" if existed else "added_edges"].append((source, target, attrs))
+        touched.update((source, target))
+
+    # LLM edges may connect new concepts to old ones — and win over embedding edges
+    for edge in llm_edges:
+        source, target = edge["source"], edge["target"]
+        if G.has_node(source) and G.has_node(target) and source != target:
+            if G.has_edge(source, target) and G[source][target].get("edge_type") == "llm":
+                continue
+            record(source, target, {"relationship": edge["relationship"], "weight": 1.0, "edge_type": "llm"})
+
+    # Similarity: new × new, then new × existing
+    pairs = []
+    if len(added) > 1:
+        rows, cols, weights = similar_pair_indices(new_vectors, threshold=threshold)
+        pairs += [(added[i]["id"], added[j]["id"], w) for i, j, w in zip(rows.tolist(), cols.tolist(), weights.tolist())]
+    if added and existing_ids:
+        rows, cols, weights = cross_similar_pair_indices(new_vectors, existing_vectors, threshold=threshold)
+        pairs += [(added[i]["id"], existing_ids[j], w) for i, j, w in zip(rows.tolist(), cols.tolist(), weights.tolist())]
+
+    for source, target, weight in pairs:
+        if G.has_node(target) and not G.has_edge(source, target):
+            record(source, target, {"relationship": "semantically similar", "weight": weight, "edge_type": "embedding"})
+
+    for node in touched:
+        G.nodes[node]["size"] = G.degree(node)
+        delta["resized"][node] = G.nodes[node]["size"]
+
+    print(f"Graph update: +{len(delta['added_nodes'])} nodes, +{len(delta['added_edges'])} edges, "
+          f"{len(delta['updated_edges'])} edges upgraded")
+    return delta
+
+def graph_fingerprint(G: nx.Graph) -> str:
+    # Identifies a graph version — same nodes and edges (and weights) → same hash.
+    # Derived results (metrics, clusters) are keyed by it so they're computed once.
+    h = hashlib.sha1("\n".join(sorted(map(str, G.nodes()))).encode("utf-8"))
+    
+    lines, weights = [], []
+    for u, v, data in G.edges(data=True):
+        u, v = str(u), str(v)
+        lines.append(f"{u}\t{v}\t{data.get('edge_type', 'llm')}" if u <= v else f"{v}\t{u}\t{data.get('edge_type', 'llm')}")
+        weights.append(data.get("weight", 1.0))
+    order = sorted(range(len(lines)), key=lines.__getitem__)
+    h.update("\n".join([lines[i] for i in order]).encode("utf-8"))
+    # Weights at float32 precision, so a round trip through the binary format keeps the hash
+    h.update(np.asarray(weights, dtype=np.float32)[order].tobytes())
+    return h.hexdigest()
+
 def graph_stats(G: nx.Graph):
     print(f"Nodes: {G.number_of_nodes()}")
     print(f"Edges: {G.number_of_edges()}")
+    
+    # Precomputed PageRank when the metrics stage has run, raw degree otherwise
+    if all("pagerank" in data for _, data in G.nodes(data=True)):
+        print(f"Most central nodes:")
+        top_nodes = sorted(G.nodes(data=True), key=lambda x: x[1]["pagerank"], reverse=True)[:5]
+        for node, data in top_nodes:
+            print(f"  {node} — PageRank {data['pagerank']:.4f}, {data['size']} connections")
+        return
+    
     print(f"Most connected nodes:")
     
     # Sort by degree and show top 5
@@ -0,0 +1,289 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import networkx as nx
+
+# Binary graph format. A directory of .npy arrays that load memory-mapped:
+#   indptr / indices      — CSR adjacency, each undirected edge stored in both rows
+#   weight / edge_type / relationship — typed per-slot edge columns
+#   node_<name>           — numeric node attributes (size, and later metrics)
+# plus string tables (node ids, descriptions) as one UTF-8 blob + offsets.
+# Loading builds no Python object per edge; networkx converters are below
+# for code that still wants an nx.Graph.
+# Each save writes a complete version into its own subdirectory, then
+# publishes it by atomically replacing one small CURRENT pointer file.
+# Readers resolve the pointer once and load everything from that version,
+# so they never mix files from two saves. A crash before the pointer moves
+# leaves the previous version live. Old versions are pruned, but the one
+# before the current is kept for readers that resolved it just before the
+# swap. Mapped files that get pruned stay readable until unmapped.
+
+GRAPH_PATH = "output/graph_csr"
+EDGE_TYPES = ("llm", "embedding")
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 2
+
+def new_version_dir(path: str) -> str:
+    version_dir = os.path.join(path, f"v{time.time_ns()}")
+    os.makedirs(version_dir)
+    return version_dir
+
+def publish_version(path: str, version_dir: str):
+    tmp = os.path.join(path, f"{CURRENT_FILE}.tmp")
+    with open(tmp, "w") as f:
+        f.write(os.path.basename(version_dir))
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+    versions = sorted(d for d in os.listdir(path) if d.startswith("v") and os.path.isdir(os.path.join(path, d)))
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != os.path.basename(version_dir):
+            shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+def current_version_dir(path: str, marker: str) -> str | None:
+    # The live version, or the directory itself for data saved before versioning
+    pointer = os.path.join(path, CURRENT_FILE)
+    if os.path.exists(pointer):
+        with open(pointer, "r") as f:
+            return os.path.join(path, f.read().strip())
+    if os.path.exists(os.path.join(path, marker)):
+        return path
+    return None
+
+class StringTable:
+    # Strings packed into one byte blob — decoded on access, not at load
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: list[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def save(self, path: str, name: str):
+        np.save(os.path.join(path, f"{name}_blob.npy"), self.blob)
+        np.save(os.path.join(path, f"{name}_offsets.npy"), self.offsets)
+
+    @classmethod
+    def load(cls, path: str, name: str, mmap_mode: str | None = "r") -> "StringTable":
+        return cls(
+            np.load(os.path.join(path, f"{name}_blob.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, f"{name}_offsets.npy"), mmap_mode=mmap_mode)
+        )
+
+class CSRGraph:
+    def __init__(self, ids: StringTable, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+                 edge_types: np.ndarray, relationships: np.ndarray, relationship_names: list[str],
+                 edge_type_names=EDGE_TYPES, descriptions: StringTable | None = None,
+                 aliases: dict | None = None, node_columns: dict | None = None, graph_attrs: dict | None = None):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.edge_types = edge_types
+        self.relationships = relationships
+        self.relationship_names = list(relationship_names)
+        self.edge_type_names = list(edge_type_names)
+        self.descriptions = descriptions
+        self.aliases = aliases or {}             # row → alias list, sparse
+        self.node_columns = node_columns or {}   # attribute name → per-node array
+        self.graph_attrs = graph_attrs or {}     # G.graph, e.g. fingerprints of derived results
+        self._index = None
+
+    def number_of_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def number_of_edges(self) -> int:
+        # Self-loops occupy one slot, every other edge two
+        rows = self.edge_rows()
+        return int(np.count_nonzero(rows <= self.indices))
+
+    def node_index(self, node_id: str) -> int:
+        # id → row dict is built once, on first lookup
+        if self._index is None:
+            self._index = {node_id: i for i, node_id in enumerate(self.ids)}
+        return self._index[node_id]
+
+    def has_node(self, node_id: str) -> bool:
+        try:
+            self.node_index(node_id)
+            return True
+        except KeyError:
+            return False
+
+    def neighbors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degree(self) -> np.ndarray:
+        # Self-loops count twice, as in networkx
+        rows = self.edge_rows()
+        return np.diff(self.indptr) + np.bincount(rows[rows == self.indices], minlength=self.number_of_nodes())
+
+    def edge_rows(self) -> np.ndarray:
+        return np.repeat(np.arange(self.number_of_nodes()), np.diff(self.indptr))
+
+    def adjacency(self, weighted: bool = True):
+        # scipy.sparse view over the same arrays — for matrix-based metrics
+        from scipy.sparse import csr_matrix
+        n = self.number_of_nodes()
+        data = np.asarray(self.weights, dtype=np.float64) if weighted else np.ones(len(self.indices))
+        return csr_matrix((data, np.asarray(self.indices), np.asarray(self.indptr)), shape=(n, n))
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph) -> "CSRGraph":
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        relationship_ids = {}
+        edge_type_names = list(EDGE_TYPES)
+
+        m = G.number_of_edges()
+        src = np.empty(m, dtype=np.int64)
+        dst = np.empty(m, dtype=np.int64)
+        weights = np.empty(m, dtype=np.float32)
+        edge_types = np.empty(m, dtype=np.uint8)
+        relationships = np.empty(m, dtype=np.int32)
+        for e, (u, v, data) in enumerate(G.edges(data=True)):
+            src[e], dst[e] = index[u], index[v]
+            weights[e] = data.get("weight", 1.0)
+            edge_type = data.get("edge_type", "llm")
+            if edge_type not in edge_type_names:
+                edge_type_names.append(edge_type)
+            edge_types[e] = edge_type_names.index(edge_type)
+            relationships[e] = relationship_ids.setdefault(data.get("relationship", ""), len(relationship_ids))
+
+        # Mirror every non-loop edge, then sort slots by row
+        mirror = src != dst
+        rows = np.concatenate([src, dst[mirror]])
+        cols = np.concatenate([dst, src[mirror]])
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(nodes)), out=indptr[1:])
+
+        # Numeric node attributes become columns; strings/lists are handled separately
+        node_columns = {}
+        for name in sorted({k for _, data in G.nodes(data=True) for k in data}):
+            if name in ("description", "aliases"):
+                continue
+            values = [G.nodes[node].get(name) for node in nodes]
+            if all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) for v in values):
+                dtype = np.int64 if all(isinstance(v, (int, np.integer)) for v in values) else np.float64
+                node_columns[name] = np.asarray(values, dtype=dtype)
+
+        return cls(
+            StringTable.from_strings([str(node) for node in nodes]),
+            indptr,
+            cols[order].astype(np.int32),
+            np.concatenate([weights, weights[mirror]])[order],
+            np.concatenate([edge_types, edge_types[mirror]])[order],
+            np.concatenate([relationships, relationships[mirror]])[order],
+            list(relationship_ids),
+            edge_type_names=edge_type_names,
+            descriptions=StringTable.from_strings([G.nodes[node].get("description", "") for node in nodes]),
+            aliases={i: G.nodes[node]["aliases"] for i, node in enumerate(nodes) if G.nodes[node].get("aliases")},
+            node_columns=node_columns,
+            graph_attrs=dict(G.graph)
+        )
+
+    def to_networkx(self) -> nx.Graph:
+        G = nx.Graph(**self.graph_attrs)
+        ids = list(self.ids)
+        columns = {name: np.asarray(values).tolist() for name, values in self.node_columns.items()}
+        for i, node in enumerate(ids):
+            attrs = {name: values[i] for name, values in columns.items()}
+            attrs["description"] = self.descriptions[i] if self.descriptions is not None else ""
+            attrs["aliases"] = self.aliases.get(i, [])
+            G.add_node(node, **attrs)
+
+        rows = self.edge_rows()
+        cols = np.asarray(self.indices)
+        keep = np.flatnonzero(rows <= cols)
+        weights = np.asarray(self.weights)[keep].tolist()
+        edge_types = np.asarray(self.edge_types)[keep].tolist()
+        relationships = np.asarray(self.relationships)[keep].tolist()
+        G.add_edges_from(
+            (ids[u], ids[v], {
+                "relationship": self.relationship_names[r],
+                "weight": w,
+                "edge_type": self.edge_type_names[t]
+            })
+            for u, v, w, t, r in zip(rows[keep].tolist(), cols[keep].tolist(), weights, edge_types, relationships)
+        )
+        return G
+
+    def save(self, path: str = GRAPH_PATH):
+        # Written into a fresh version directory — no reader has these files open
+        os.makedirs(path, exist_ok=True)
+        version_dir = new_version_dir(path)
+        self.ids.save(version_dir, "ids")
+        if self.descriptions is not None:
+            self.descriptions.save(version_dir, "descriptions")
+        for name in ("indptr", "indices", "weights", "edge_types", "relationships"):
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.asarray(getattr(self, name)))
+        for name, values in self.node_columns.items():
+            np.save(os.path.join(version_dir, f"node_{name}.npy"), np.asarray(values))
+
+        with open(os.path.join(version_dir, "meta.json"), "w") as f:
+            json.dump({
+                "nodes": self.number_of_nodes(),
+                "relationship_names": self.relationship_names,
+                "edge_type_names": self.edge_type_names,
+                "aliases": {str(i): a for i, a in self.aliases.items()},
+                "node_columns": list(self.node_columns),
+                "has_descriptions": self.descriptions is not None,
+                "graph": self.graph_attrs
+            }, f)
+        publish_version(path, version_dir)
+        print(f"Binary graph saved to {path} ({self.number_of_nodes()} nodes, {len(self.indices)} adjacency slots)")
+
+    @classmethod
+    def load(cls, path: str = GRAPH_PATH, mmap: bool = True) -> "CSRGraph":
+        mmap_mode = "r" if mmap else None
+        version_dir = current_version_dir(path, "meta.json")
+        if version_dir is None:
+            raise FileNotFoundError(f"No binary graph saved at {path}")
+        path = version_dir
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        return cls(
+            StringTable.load(path, "ids", mmap_mode),
+            array("indptr"),
+            array("indices"),
+            array("weights"),
+            array("edge_types"),
+            array("relationships"),
+            meta["relationship_names"],
+            edge_type_names=meta["edge_type_names"],
+            descriptions=StringTable.load(path, "descriptions", mmap_mode) if meta["has_descriptions"] else None,
+            aliases={int(i): a for i, a in meta["aliases"].items()},
+            node_columns={name: array(f"node_{name}") for name in meta["node_columns"]},
+            graph_attrs=meta.get("graph", {})
+        )
+
+def save_graph_binary(G: nx.Graph, path: str = GRAPH_PATH) -> CSRGraph:
+    csr = CSRGraph.from_networkx(G)
+    csr.save(path)
+    return csr
+
+def load_graph_binary(path: str = GRAPH_PATH, mmap: bool = True) -> CSRGraph:
+    return CSRGraph.load(path, mmap=mmap)
+
+def graph_exists(path: str = GRAPH_PATH) -> bool:
+    return current_version_dir(path, "meta.json") is not None
@@ -1,6 +1,7 @@
 import networkx as nx
 import numpy as np
 from src.graph import load_graph
+from src.node_table import NodeTable
 import json
 import os
 
@@ -20,22 +21,36 @@ def compute_spring_layout(G: nx.Graph, seed: int = 42) -> dict:
     pos_serializable = {node: pos[node].tolist() for node in pos}
     return pos_serializable
 
-def compute_umap_layout(G: nx.Graph, nodes_with_embeddings: list[dict]) -> dict:
+def compute_umap_layout(G: nx.Graph, nodes_with_embeddings: list[dict] | NodeTable,
+                        vectors: np.ndarray | None = None) -> dict:
     print("Computing UMAP layout...")
     
     try:
         import umap
         
-        # Build a lookup for embeddings by node id
-        embedding_lookup = {
-            n["id"]: n["embedding"] 
-            for n in nodes_with_embeddings 
-            if "embedding" in n
-        }
-        
-        # Only use nodes that exist in both graph and embeddings
-        valid_nodes = [n for n in G.nodes() if n in embedding_lookup]
-        vectors = np.array([embedding_lookup[n] for n in valid_nodes])
+        if isinstance(nodes_with_embeddings, NodeTable) and nodes_with_embeddings.vectors is not None:
+            # The table already holds a contiguous matrix and an id → row index
+            row_lookup = nodes_with_embeddings.index
+            if vectors is None:
+                vectors = nodes_with_embeddings.vectors
+            valid_nodes = [n for n in G.nodes() if n in row_lookup]
+            vectors = np.asarray(vectors[[row_lookup[n] for n in valid_nodes]], dtype=np.float32)
+        elif vectors is not None:
+            # Row-aligned matrix (e.g. a mapped embedding store) — index rows, no lists
+            row_lookup = {n["id"]: i for i, n in enumerate(nodes_with_embeddings)}
+            valid_nodes = [n for n in G.nodes() if n in row_lookup]
+            vectors = np.asarray(vectors[[row_lookup[n] for n in valid_nodes]], dtype=np.float32)
+        else:
+            # Build a lookup for embeddings by node id
+            embedding_lookup = {
+                n["id"]: n["embedding"] 
+                for n in nodes_with_embeddings 
+                if "embedding" in n
+            }
+            
+            # Only use nodes that exist in both graph and embeddings
+            valid_nodes = [n for n in G.nodes() if n in embedding_lookup]
+            vectors = np.array([embedding_lookup[n] for n in valid_nodes])
         
         reducer = umap.UMAP(
             n_components=3,
@@ -69,6 +84,31 @@ def compute_umap_layout(G: nx.Graph, nodes_with_embeddings: list[dict]) -> dict:
         print(f"UMAP failed: {e}, falling back to spring layout")
         return compute_spring_layout(G)
 
+def apply_layout_delta(pos: dict, G: nx.Graph, delta: dict, jitter: float = 0.05, seed: int = 42) -> dict:
+    # Places nodes from an update_graph delta without refitting the layout:
+    # each new node lands at the centroid of its already-placed neighbours
+    rng = np.random.default_rng(seed)
+    dims = len(next(iter(pos.values()))) if pos else 3
+    center = np.mean(list(pos.values()), axis=0) if pos else np.zeros(dims)
+
+    # New nodes linked only to other new nodes get placed on a later pass
+    pending = list(delta["added_nodes"])
+    for _ in range(2):
+        unplaced = []
+        for node in pending:
+            anchors = [pos[n] for n in G.neighbors(node) if n in pos]
+            if not anchors:
+                unplaced.append(node)
+                continue
+            p = np.mean(anchors, axis=0) + rng.normal(scale=jitter, size=dims)
+            pos[node] = [float(x) for x in p]
+        pending = unplaced
+
+    for node in pending:
+        pos[node] = [float(x) for x in center + rng.normal(scale=1.0, size=dims)]
+
+    return pos
+
 def save_layout(pos: dict, path: str = "output/layout.json"):
     os.makedirs("output", exist_ok=True)
     with open(path, "w") as f:
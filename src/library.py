@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import numpy as np
+import networkx as nx
+from src.embeddings import similar_pair_indices, cross_similar_pair_indices
+from src.graph_store import CSRGraph, graph_exists
+from src.node_table import NodeTable
+from src.metrics import ensure_metrics, refresh_metrics
+from src.clustering import cluster_graph, recluster
+
+# Multi-book library. Each book is a shard under output/library/books/<id>:
+#   nodes/        NodeTable (ids, descriptions, embedding matrix)
+#   edges.json    LLM edges plus the book's own similarity edges
+# Similarity between two books lives in cross/<a>__<b>.json and is computed
+# once, when the later of the two is added — adding a book scores only the
+# new shard against existing shards. The merged graph is updated in place on
+# add, and metrics and clusters are refreshed only for the connected
+# components the new shard touches; removing a book drops its files and
+# rebuilds from the stored edges without re-scoring anything.
+
+LIBRARY_PATH = "output/library"
+
+class Library:
+    def __init__(self, root: str = LIBRARY_PATH, threshold: float = 0.75):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.graph_path = os.path.join(root, "graph_csr")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"threshold": threshold, "books": {}}
+
+    def books(self) -> dict:
+        return self.manifest["books"]
+
+    def _book_dir(self, book_id: str) -> str:
+        return os.path.join(self.root, "books", book_id)
+
+    def _cross_path(self, a: str, b: str) -> str:
+        a, b = sorted((a, b))
+        return os.path.join(self.root, "cross", f"{a}__{b}.json")
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def load_shard(self, book_id: str) -> tuple[NodeTable, dict]:
+        table = NodeTable.load(os.path.join(self._book_dir(book_id), "nodes"))
+        with open(os.path.join(self._book_dir(book_id), "edges.json"), "r") as f:
+            edges = json.load(f)
+        return table, edges
+
+    def _load_cross(self, a: str, b: str) -> list[dict]:
+        with open(self._cross_path(a, b), "r") as f:
+            return json.load(f)
+
+    def add_book(self, book_id: str, nodes: NodeTable | list[dict], edges: list[dict], title: str | None = None) -> dict:
+        # Returns the merged graph's size and how many cross-book links the book added
+        if book_id in self.books():
+            self.remove_book(book_id)
+
+        table = nodes if isinstance(nodes, NodeTable) else NodeTable.from_nodes(nodes)
+        if table.vectors is None:
+            raise ValueError(f"Book '{book_id}' has no embeddings — embed its concepts before adding it")
+        threshold = self.manifest["threshold"]
+
+        # Within-book similarity, stored with the shard
+        rows, cols, weights = similar_pair_indices(table.vectors, threshold=threshold)
+        similar = [
+            {"source": table.ids[i], "target": table.ids[j], "relationship": "semantically similar", "weight": w}
+            for i, j, w in zip(rows.tolist(), cols.tolist(), weights.tolist())
+        ]
+        table.save(os.path.join(self._book_dir(book_id), "nodes"))
+        with open(os.path.join(self._book_dir(book_id), "edges.json"), "w") as f:
+            json.dump({"llm": edges, "similar": similar}, f)
+
+        # Cross-book similarity — only the new shard against each existing one
+        os.makedirs(os.path.join(self.root, "cross"), exist_ok=True)
+        cross_edges = []
+        for other_id in self.books():
+            other = NodeTable.load(os.path.join(self._book_dir(other_id), "nodes"))
+            rows, cols, weights = cross_similar_pair_indices(table.vectors, other.vectors, threshold=threshold)
+            cross = [
+                {"source": table.ids[i], "target": other.ids[j], "relationship": "semantically similar", "weight": w}
+                for i, j, w in zip(rows.tolist(), cols.tolist(), weights.tolist())
+                if table.ids[i] != other.ids[j]  # the same concept in two books is one merged node
+            ]
+            with open(self._cross_path(book_id, other_id), "w") as f:
+                json.dump(cross, f)
+            cross_edges += cross
+
+        # Merge into the library graph in place — existing nodes and edges are untouched
+        G = self.merged_graph()
+        before = G.number_of_nodes()
+        touched = self._merge_shard(G, book_id, table, edges, similar + cross_edges)
+        refresh_metrics(G, touched, previous_nodes=before)
+        recluster(G, touched)
+        CSRGraph.from_networkx(G).save(self.graph_path)
+
+        self.manifest["books"][book_id] = {"title": title or book_id, "nodes": len(table), "edges": len(edges)}
+        self._save_manifest()
+        print(f"Library: added '{title or book_id}' — {G.number_of_nodes() - before} new concepts, "
+              f"{len(cross_edges)} cross-book links, {G.number_of_nodes()} concepts total")
+        return {"book": book_id, "nodes": G.number_of_nodes(), "cross_edges": len(cross_edges)}
+
+    def _merge_shard(self, G: nx.Graph, book_id: str, table: NodeTable, llm_edges: list[dict], similar: list[dict]):
+        touched = set()
+        for node in table.records():
+            if G.has_node(node["id"]):
+                G.nodes[node["id"]]["books"] = G.nodes[node["id"]].get("books", []) + [book_id]
+            else:
+                G.add_node(node["id"], description=node["description"], aliases=node["aliases"], books=[book_id], size=0)
+            touched.add(node["id"])
+
+        # Same precedence as build_graph: LLM edges win over similarity edges
+        for edge in llm_edges:
+            source, target = edge["source"], edge["target"]
+            if G.has_node(source) and G.has_node(target):
+                G.add_edge(source, target, relationship=edge["relationship"], weight=1.0, edge_type="llm")
+                touched.update((source, target))
+        for edge in similar:
+            source, target = edge["source"], edge["target"]
+            if G.has_node(source) and G.has_node(target) and not G.has_edge(source, target):
+                G.add_edge(source, target, relationship="semantically similar", weight=edge["weight"], edge_type="embedding")
+                touched.update((source, target))
+
+        for node in touched:
+            G.nodes[node]["size"] = G.degree(node)
+        return touched
+
+    def _save_graph(self, G: nx.Graph):
+        ensure_metrics(G)
+        cluster_graph(G)
+        CSRGraph.from_networkx(G).save(self.graph_path)
+
+    def remove_book(self, book_id: str):
+        if book_id not in self.books():
+            raise KeyError(f"Book '{book_id}' is not in the library")
+
+        shutil.rmtree(self._book_dir(book_id), ignore_errors=True)
+        for other_id in self.books():
+            if other_id != book_id and os.path.exists(self._cross_path(book_id, other_id)):
+                os.remove(self._cross_path(book_id, other_id))
+        del self.manifest["books"][book_id]
+        self._save_manifest()
+
+        # Rebuilt from stored shards and cross edges — no similarity is recomputed
+        G = nx.Graph()
+        remaining = list(self.books())
+        for i, other_id in enumerate(remaining):
+            table, edges = self.load_shard(other_id)
+            similar = edges["similar"] + [edge for earlier in remaining[:i] for edge in self._load_cross(other_id, earlier)]
+            self._merge_shard(G, other_id, table, edges["llm"], similar)
+        self._save_graph(G)
+        print(f"Library: removed '{book_id}', {G.number_of_nodes()} concepts remain")
+
+    def merged_graph(self) -> nx.Graph:
+        if not graph_exists(self.graph_path) or not self.books():
+            return nx.Graph()
+        G = CSRGraph.load(self.graph_path).to_networkx()
+        # The binary format keeps numeric columns and aliases only — restore book membership from the shards
+        for book_id in self.books():
+            for node_id in NodeTable.load(os.path.join(self._book_dir(book_id), "nodes")).ids:
+                if G.has_node(node_id):
+                    books = G.nodes[node_id].setdefault("books", [])
+                    if book_id not in books:
+                        books.append(book_id)
+        return G
+
+    def merged_table(self) -> NodeTable:
+        # One row per merged concept, for layout — first book's embedding wins for shared concepts
+        ids, descriptions, vectors, seen = [], [], [], set()
+        for book_id in self.books():
+            table = NodeTable.load(os.path.join(self._book_dir(book_id), "nodes"))
+            keep = [i for i, node_id in enumerate(table.ids) if node_id not in seen]
+            seen.update(table.ids[i] for i in keep)
+            ids += [table.ids[i] for i in keep]
+            descriptions += [table.descriptions[i] for i in keep]
+            vectors.append(np.asarray(table.vectors[keep], dtype=np.float32))
+        return NodeTable(ids, descriptions, vectors=np.concatenate(vectors) if vectors else None)
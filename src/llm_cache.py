@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.concepts import MODEL, SYSTEM_PROMPT
+
+# Per-chunk cache of parsed extract_concepts results. Entries are keyed by
+# model, prompt and chunk text, so changing any of them is a clean miss
+# rather than a stale hit.
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ConceptCache:
+    def __init__(self, path: str = "output/cache/concepts.sqlite", max_bytes: int = 200 * 1024 * 1024,
+                 model: str = MODEL, system_prompt: str = SYSTEM_PROMPT):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.model = model
+        self.prompt_hash = _sha256(system_prompt)
+        self.hits = 0
+        self.misses = 0
+
+        # One connection shared by threads/event loops, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS concepts (
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, prompt_hash, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON concepts (last_used)")
+        self._conn.commit()
+
+    def for_prompt(self, system_prompt: str) -> "ConceptCache":
+        # Same file and size cap, keyed by another prompt — e.g. packed extraction
+        return ConceptCache(self.path, self.max_bytes, self.model, system_prompt)
+
+    def _key(self, chunk: str) -> tuple:
+        return (self.model, self.prompt_hash, _sha256(chunk))
+
+    def get(self, chunk: str) -> dict | None:
+        key = self._key(chunk)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM concepts WHERE model = ? AND prompt_hash = ? AND text_hash = ?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE concepts SET last_used = ? WHERE model = ? AND prompt_hash = ? AND text_hash = ?",
+                (time.time(), *key)
+            )
+            self._conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, chunk: str, result: dict):
+        # An empty result is usually a parse failure — worth retrying next run
+        if not result.get("nodes"):
+            return
+
+        payload = json.dumps(result)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO concepts VALUES (?, ?, ?, ?, ?, ?)",
+                (*self._key(chunk), payload, len(payload), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until we're back under budget
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM concepts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT rowid, size FROM concepts ORDER BY last_used ASC").fetchall()
+        stale = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((rowid,))
+            total -= size
+        self._conn.executemany("DELETE FROM concepts WHERE rowid = ?", stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM concepts").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+import numpy as np
+
+# Sys path so `python src/load_test.py` works from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.query_service import serve
+from src.graph import load_graph
+from src.graph_store import CSRGraph, GRAPH_PATH, graph_exists
+
+# Load test for the query service. Concepts are drawn Zipf-style so a few
+# hot concepts dominate, like real exploration, and latencies are reported
+# per endpoint as p50/p99.
+
+ENDPOINTS = ("ego", "neighbors", "path", "cluster")
+
+def _make_query(endpoint: str, ids: list[str], rng: random.Random) -> str:
+    def pick():
+        # Low ranks are picked far more often
+        return ids[min(int(rng.paretovariate(1.2)) - 1, len(ids) - 1)]
+
+    if endpoint == "path":
+        return "/path?" + urlencode({"source": pick(), "target": pick()})
+    if endpoint == "ego":
+        return "/ego?" + urlencode({"node": pick(), "radius": 1})
+    if endpoint == "neighbors":
+        return "/neighbors?" + urlencode({"node": pick(), "k": 2})
+    return "/cluster?" + urlencode({"node": pick()})
+
+def run_load_test(base_url: str, ids: list[str], requests: int = 2000, concurrency: int = 8, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    ids = list(ids)
+    rng.shuffle(ids)  # so the "hot" concepts aren't just the first ones in the file
+    queries = [(endpoint, _make_query(endpoint, ids, rng))
+               for endpoint in (rng.choice(ENDPOINTS) for _ in range(requests))]
+
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = []
+    lock = threading.Lock()
+    position = iter(range(len(queries)))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                return
+            endpoint, path = queries[i]
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path) as response:
+                    response.read()
+            except urllib.error.URLError as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[endpoint].append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    report = {"requests": requests, "errors": len(errors), "requests_per_second": requests / wall, "endpoints": {}}
+    print(f"\n{'endpoint':>10}  {'count':>6}  {'p50 ms':>8}  {'p99 ms':>8}")
+    for endpoint, values in latencies.items():
+        if not values:
+            continue
+        p50, p99 = np.percentile(values, [50, 99]) * 1000
+        report["endpoints"][endpoint] = {"count": len(values), "p50_ms": float(p50), "p99_ms": float(p99)}
+        print(f"{endpoint:>10}  {len(values):>6}  {p50:>8.2f}  {p99:>8.2f}")
+
+    with urllib.request.urlopen(base_url + "/stats") as response:
+        stats = json.load(response)
+    report["cache_hit_rate"] = stats["cache_hit_rate"]
+    print(f"{report['requests_per_second']:.0f} req/s, {len(errors)} errors, "
+          f"cache hit rate {stats['cache_hit_rate']:.1%}")
+    return report
+
+if __name__ == "__main__":
+    # Usage: python src/load_test.py [--graph output/graph_csr] [--requests 2000] [--concurrency 8]
+    # Starts the service in-process on a free port, or targets --url if given.
+    parser = argparse.ArgumentParser(description="Query service load test")
+    parser.add_argument("--graph", default=GRAPH_PATH if graph_exists() else "output/graph.json")
+    parser.add_argument("--url")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default="output/load_test.json")
+    args = parser.parse_args()
+
+    ids = None
+    if args.url:
+        # Only the ids are needed to build queries against a running service
+        ids = list(CSRGraph.load(args.graph).ids) if os.path.isdir(args.graph) else list(load_graph(args.graph).nodes())
+    server = None
+    if args.url is None:
+        server = serve(args.graph, port=0)
+        ids = server.RequestHandlerClass.index.ids
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        args.url = f"http://127.0.0.1:{server.server_port}"
+
+    report = run_load_test(args.url, ids, requests=args.requests, concurrency=args.concurrency)
+    if server is not None:
+        server.shutdown()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Load test report saved to {args.output}")
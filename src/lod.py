@@ -0,0 +1,229 @@
+import json
+import os
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix
+from src.clustering import cluster_graph
+from src.metrics import node_importance
+
+# Level-of-detail hierarchy for large graphs. Level 0 is the concept graph;
+# each level above collapses clusters of the one below into super-nodes with
+# summed importance, importance-weighted centroid positions and aggregated
+# edges (Mᵀ A M on sparse matrices). The top level is kept under
+# max_top_nodes, so the first render is bounded however big the book is;
+# expanding a super-node swaps it for its children one level down.
+#   level 1   — the graph's own clusters (cluster_graph, shared with colouring)
+#   level 2+  — Louvain on the coarse graph at decreasing resolution, falling
+#               back to k-means on positions when modularity stops merging
+
+LOD_PATH = "output/lod"
+LOD_MIN_NODES = 2000   # smaller graphs are rendered whole
+MAX_VIEW_EDGES = 5000
+
+def _spatial_groups(positions: np.ndarray, weights: np.ndarray, groups: int, seed: int = 42, iterations: int = 10) -> np.ndarray:
+    # Weighted k-means on layout positions — nearby super-nodes merge
+    rng = np.random.default_rng(seed)
+    centers = positions[rng.choice(len(positions), size=groups, replace=False)]
+    for _ in range(iterations):
+        assign = np.argmin(((positions[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2), axis=1)
+        totals = np.bincount(assign, weights=weights, minlength=groups)
+        for dim in range(positions.shape[1]):
+            summed = np.bincount(assign, weights=weights * positions[:, dim], minlength=groups)
+            centers[:, dim] = np.where(totals > 0, summed / np.maximum(totals, 1e-12), centers[:, dim])
+    _, assign = np.unique(assign, return_inverse=True)
+    return assign
+
+def _louvain_groups(A: csr_matrix, resolution: float, seed: int) -> np.ndarray:
+    coarse = nx.from_scipy_sparse_array(A)
+    coarse.remove_edges_from(nx.selfloop_edges(coarse))
+    communities = nx.community.louvain_communities(coarse, weight="weight", resolution=resolution, seed=seed)
+    groups = np.empty(A.shape[0], dtype=np.int64)
+    for i, comm in enumerate(communities):
+        groups[list(comm)] = i
+    return groups
+
+class LODHierarchy:
+    def __init__(self, ids: list[str], importance: np.ndarray, positions: np.ndarray, edges: tuple,
+                 ancestors: list[np.ndarray], levels: list[dict]):
+        self.ids = ids
+        self.importance = importance      # per concept
+        self.positions = positions        # per concept, (n, 2 or 3)
+        self.edges = edges                # (src, dst, weight) arrays over concepts
+        self.ancestors = ancestors        # ancestors[L - 1][i] = concept i's super-node at level L
+        self.levels = levels              # per level ≥ 1: leader concept, counts, importance, positions
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    @classmethod
+    def build(cls, G: nx.Graph, pos: dict, max_top_nodes: int = 300, max_levels: int = 5, seed: int = 42) -> "LODHierarchy":
+        ids = list(G.nodes())
+        index = {node: i for i, node in enumerate(ids)}
+        scores = node_importance(G)
+        importance = np.array([scores[node] for node in ids], dtype=np.float64)
+        importance = np.maximum(importance, 1e-9)
+
+        placed = [pos[node] for node in ids if node in pos]
+        fallback = np.mean(placed, axis=0) if placed else np.zeros(3)
+        positions = np.array([pos.get(node, fallback) for node in ids], dtype=np.float64)
+
+        src = np.array([index[u] for u, v in G.edges()], dtype=np.int64)
+        dst = np.array([index[v] for u, v in G.edges()], dtype=np.int64)
+        weight = np.array([w for _, _, w in G.edges(data="weight", default=1.0)], dtype=np.float64)
+        n = len(ids)
+        A = csr_matrix((np.concatenate([weight, weight]), (np.concatenate([src, dst]), np.concatenate([dst, src]))), shape=(n, n))
+
+        # Level 1 reuses the graph's stored clusters, so super-nodes match the colours
+        clusters = cluster_graph(G)
+        groups = np.array([clusters[node] for node in ids], dtype=np.int64)
+
+        ancestors, levels = [], []
+        child_leaders = np.arange(n)
+        child_importance, child_positions, child_counts = importance, positions, np.ones(n)
+        resolution = 1.0
+        while True:
+            k = len(child_leaders)
+            g = int(groups.max()) + 1
+            M = csr_matrix((np.ones(k), (np.arange(k), groups)), shape=(k, g))
+
+            level_importance = M.T @ child_importance
+            level_positions = (M.T @ (child_positions * child_importance[:, None])) / level_importance[:, None]
+            level_counts = M.T @ child_counts
+            # Each super-node is led (and named) by its most important concept
+            order = np.lexsort((-child_importance, groups))
+            first = np.flatnonzero(np.r_[True, groups[order][1:] != groups[order][:-1]])
+            leaders = child_leaders[order[first]]
+
+            A = (M.T @ A @ M).tocsr()
+            ancestors.append(groups if not ancestors else groups[ancestors[-1]])
+            levels.append({
+                "leaders": leaders,
+                "counts": level_counts,
+                "importance": level_importance,
+                "positions": level_positions
+            })
+
+            if g <= max_top_nodes or len(levels) >= max_levels:
+                break
+
+            # Next level: coarser Louvain, or spatial merging when modularity won't shrink it
+            resolution /= 2
+            next_groups = _louvain_groups(A, resolution, seed)
+            if next_groups.max() + 1 > 0.7 * g:
+                next_groups = _spatial_groups(level_positions, level_importance, max(max_top_nodes, g // 4), seed)
+            child_leaders, child_importance = leaders, level_importance
+            child_positions, child_counts = level_positions, level_counts
+            groups = next_groups
+
+        if len(levels[-1]["leaders"]) > max_top_nodes:
+            print(f"LOD: top level still has {len(levels[-1]['leaders'])} super-nodes after {max_levels} levels")
+        print(f"LOD hierarchy: {n} concepts → " + " → ".join(str(len(level["leaders"])) for level in levels))
+        return cls(ids, importance, positions, (src, dst, weight), ancestors, levels)
+
+    def parse_key(self, key: str) -> tuple[int, int]:
+        # "L<level>:<index>" → (level, index), validated against the hierarchy
+        level, _, index = key[1:].partition(":")
+        if not (key.startswith("L") and level.isdigit() and index.isdigit()):
+            raise ValueError(f"Not a super-node key: '{key}'")
+        level, index = int(level), int(index)
+        if not (1 <= level <= self.depth and index < len(self.levels[level - 1]["leaders"])):
+            raise ValueError(f"No super-node '{key}' in this hierarchy")
+        return level, index
+
+    def label(self, key: str) -> str:
+        # "leader (+others)" for a super-node key
+        level, index = self.parse_key(key)
+        data = self.levels[level - 1]
+        return f"{self.ids[int(data['leaders'][index])]} (+{int(data['counts'][index]) - 1})"
+
+    def _representatives(self, expanded: set[str]) -> tuple[np.ndarray, np.ndarray]:
+        # The visible item for every concept: its highest ancestor that isn't expanded
+        n = len(self.ids)
+        open_masks = [np.zeros(len(data["leaders"]), dtype=bool) for data in self.levels]
+        for key in expanded:
+            level, index = self.parse_key(key)
+            open_masks[level - 1][index] = True
+
+        rep_level = np.full(n, self.depth)
+        rep_index = self.ancestors[-1].copy()
+        for level in range(self.depth, 0, -1):
+            open_mask = open_masks[level - 1]
+            descend = (rep_level == level) & open_mask[rep_index]
+            rep_level[descend] = level - 1
+            rep_index[descend] = self.ancestors[level - 2][descend] if level > 1 else np.flatnonzero(descend)
+        return rep_level, rep_index
+
+    def view(self, expanded=(), max_edges: int = MAX_VIEW_EDGES) -> dict:
+        # Visible nodes and aggregated edges for the top level with these super-nodes expanded.
+        # Keys: "L<level>:<index>" for super-nodes, the concept id at level 0.
+        expanded = set(expanded)
+        rep_level, rep_index = self._representatives(expanded)
+        items, inverse = np.unique(np.stack([rep_level, rep_index], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+
+        nodes = []
+        for item, (level, i) in enumerate(items.tolist()):
+            if level == 0:
+                nodes.append({
+                    "key": self.ids[i], "label": self.ids[i], "level": 0, "count": 1,
+                    "importance": float(self.importance[i]), "pos": self.positions[i].tolist(),
+                    "cluster": int(self.ancestors[0][i])
+                })
+            else:
+                data = self.levels[level - 1]
+                leader = int(data["leaders"][i])
+                nodes.append({
+                    "key": f"L{level}:{i}", "label": self.label(f"L{level}:{i}"), "level": level,
+                    "count": int(data["counts"][i]), "importance": float(data["importance"][i]),
+                    "pos": data["positions"][i].tolist(), "cluster": int(self.ancestors[0][leader])
+                })
+
+        # Aggregate concept edges between visible items, heaviest first, capped
+        src, dst, weight = self.edges
+        a, b = inverse[src], inverse[dst]
+        keep = a != b
+        a, b, w = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep]), weight[keep]
+        pairs, pair_inverse = np.unique(np.stack([a, b], axis=1), axis=0, return_inverse=True)
+        totals = np.bincount(pair_inverse.ravel(), weights=w, minlength=len(pairs))
+        counts = np.bincount(pair_inverse.ravel(), minlength=len(pairs))
+        top = np.argsort(-totals, kind="stable")[:max_edges]
+        edges = [
+            {"source": nodes[i]["key"], "target": nodes[j]["key"], "weight": float(t), "count": int(c)}
+            for (i, j), t, c in zip(pairs[top].tolist(), totals[top].tolist(), counts[top].tolist())
+        ]
+        return {"nodes": nodes, "edges": edges, "expanded": sorted(expanded)}
+
+    def save(self, path: str = LOD_PATH):
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "importance": self.importance, "positions": self.positions,
+            "src": self.edges[0], "dst": self.edges[1], "weight": self.edges[2]
+        }
+        for level, (ancestors, data) in enumerate(zip(self.ancestors, self.levels), start=1):
+            arrays[f"ancestors_{level}"] = ancestors
+            for name in ("leaders", "counts", "importance", "positions"):
+                arrays[f"{name}_{level}"] = data[name]
+        np.savez(os.path.join(path, "hierarchy.npz"), **arrays)
+        with open(os.path.join(path, "ids.json"), "w") as f:
+            json.dump({"ids": self.ids, "depth": self.depth}, f)
+        print(f"LOD hierarchy saved to {path}")
+
+    @classmethod
+    def load(cls, path: str = LOD_PATH) -> "LODHierarchy":
+        with open(os.path.join(path, "ids.json"), "r") as f:
+            meta = json.load(f)
+        data = np.load(os.path.join(path, "hierarchy.npz"))
+        levels = [
+            {name: data[f"{name}_{level}"] for name in ("leaders", "counts", "importance", "positions")}
+            for level in range(1, meta["depth"] + 1)
+        ]
+        return cls(
+            meta["ids"], data["importance"], data["positions"],
+            (data["src"], data["dst"], data["weight"]),
+            [data[f"ancestors_{level}"] for level in range(1, len(levels) + 1)],
+            levels
+        )
+
+def lod_exists(path: str = LOD_PATH) -> bool:
+    return os.path.exists(os.path.join(path, "ids.json"))
@@ -0,0 +1,152 @@
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix, diags
+from src.graph import graph_fingerprint
+
+# Node importance, computed once per graph version with sparse-matrix methods
+# and stored as node attributes, so rendering, labelling and animation order
+# read precomputed values instead of re-sorting degrees:
+#   pagerank         weighted PageRank by power iteration
+#   weighted_degree  sum of edge weights
+#   betweenness      Brandes betweenness from sampled sources, run as batched
+#                    sparse BFS (hop distances — weights are similarities, not lengths)
+
+METRIC_NAMES = ("pagerank", "weighted_degree", "betweenness")
+
+def _adjacency(G: nx.Graph) -> tuple[list, csr_matrix]:
+    nodes = list(G.nodes())
+    return nodes, nx.to_scipy_sparse_array(G, nodelist=nodes, weight="weight", format="csr")
+
+def pagerank(A: csr_matrix, alpha: float = 0.85, tol: float = 1e-10, max_iter: int = 200) -> np.ndarray:
+    n = A.shape[0]
+    if n == 0:
+        return np.empty(0)
+    out_weight = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    # Row-stochastic transition matrix, transposed once so each step is one matvec
+    P = (diags(np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, out_weight))) @ A).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        rank = alpha * (P @ rank + rank[dangling].sum() / n) + (1 - alpha) / n
+        if np.abs(rank - previous).sum() < n * tol:
+            break
+    return rank / rank.sum()
+
+def approximate_betweenness(A: csr_matrix, samples: int | None = 256, batch: int = 64, seed: int = 42) -> np.ndarray:
+    # samples=None (or ≥ n) is exact; otherwise scaled by n / samples like networkx's k
+    n = A.shape[0]
+    if n <= 2:
+        return np.zeros(n)
+    B = (A != 0).astype(np.float64).tocsr()
+    rng = np.random.default_rng(seed)
+    sources = np.arange(n) if samples is None or samples >= n else rng.choice(n, size=samples, replace=False)
+
+    bc = np.zeros(n)
+    for start in range(0, len(sources), batch):
+        S = sources[start:start + batch]
+        cols = np.arange(len(S))
+
+        # Forward: level-synchronous BFS for the whole batch, counting shortest paths
+        sigma = np.zeros((n, len(S)))
+        depth = np.full((n, len(S)), -1, dtype=np.int32)
+        sigma[S, cols] = 1.0
+        depth[S, cols] = 0
+        frontier = sigma.copy()
+        d = 0
+        while True:
+            reached = B @ frontier
+            reached[depth >= 0] = 0.0
+            if not reached.any():
+                break
+            d += 1
+            depth[reached > 0] = d
+            sigma += reached
+            frontier = reached
+
+        # Backward: dependencies flow from depth k to its predecessors at depth k - 1
+        delta = np.zeros((n, len(S)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for k in range(d, 0, -1):
+                at_k = depth == k
+                coefficient = np.where(at_k, (1.0 + delta) / sigma, 0.0)
+                delta += np.where(depth == k - 1, sigma * (B @ coefficient), 0.0)
+
+        delta[depth == 0] = 0.0
+        bc += delta.sum(axis=1)
+
+    # Same normalisation as networkx.betweenness_centrality(normalized=True)
+    return bc / ((n - 1) * (n - 2)) * (n / len(sources))
+
+def compute_metrics(G: nx.Graph, betweenness_samples: int | None = 256, seed: int = 42) -> dict:
+    nodes, A = _adjacency(G)
+    values = {
+        "pagerank": pagerank(A),
+        "weighted_degree": np.asarray(A.sum(axis=1)).ravel(),
+        "betweenness": approximate_betweenness(A, samples=betweenness_samples, seed=seed)
+    }
+    return {name: dict(zip(nodes, column.tolist())) for name, column in values.items()}
+
+def ensure_metrics(G: nx.Graph, betweenness_samples: int | None = 256, seed: int = 42) -> nx.Graph:
+    # No-op when the graph already carries metrics for its current version
+    fingerprint = graph_fingerprint(G)
+    if G.graph.get("metrics_fingerprint") == fingerprint:
+        return G
+
+    print(f"Computing node metrics ({G.number_of_nodes()} nodes)...")
+    for name, values in compute_metrics(G, betweenness_samples, seed).items():
+        nx.set_node_attributes(G, values, name)
+    G.graph["metrics_fingerprint"] = fingerprint
+    return G
+
+def refresh_metrics(G: nx.Graph, touched: set, previous_nodes: int, betweenness_samples: int | None = 256,
+                    seed: int = 42, alpha: float = 0.85) -> nx.Graph:
+    # After an in-place merge, recomputes only the connected components that
+    # contain a touched node. Components never interact, so the others keep
+    # their values up to the global normalisation, which is rescaled here:
+    #   pagerank     each node's unnormalised mass is 1/(1-alpha), or 1 when
+    #                isolated; untouched nodes keep their share of their mass
+    #   betweenness  raw pair counts are scaled from (n-1)(n-2) before to after
+    if any("pagerank" not in data for node, data in G.nodes(data=True) if node not in touched):
+        return ensure_metrics(G, betweenness_samples, seed)
+
+    affected = set()
+    for node in touched:
+        if node not in affected:
+            affected |= nx.node_connected_component(G, node)
+    untouched = [node for node in G.nodes() if node not in affected]
+    print(f"Refreshing node metrics ({len(affected)} of {G.number_of_nodes()} nodes)...")
+
+    def mass(nodes) -> float:
+        return sum(1.0 if G.degree(node, weight="weight") == 0 else 1.0 / (1 - alpha) for node in nodes)
+
+    n = G.number_of_nodes()
+    total_mass = mass(G.nodes())
+    old_share = sum(G.nodes[node]["pagerank"] for node in untouched)
+    pagerank_scale = mass(untouched) / total_mass / old_share if old_share > 0 else 0.0
+    old_pairs = (previous_nodes - 1) * (previous_nodes - 2)
+    betweenness_scale = old_pairs / ((n - 1) * (n - 2)) if n > 2 and old_pairs > 0 else 0.0
+    for node in untouched:
+        G.nodes[node]["pagerank"] *= pagerank_scale
+        G.nodes[node]["betweenness"] *= betweenness_scale
+
+    nodes, A = _adjacency(G.subgraph(affected))
+    k = len(nodes)
+    values = {
+        "pagerank": pagerank(A, alpha=alpha) * mass(nodes) / total_mass,
+        "weighted_degree": np.asarray(A.sum(axis=1)).ravel(),
+        "betweenness": approximate_betweenness(A, samples=betweenness_samples, seed=seed)
+                       * ((k - 1) * (k - 2) / ((n - 1) * (n - 2)) if k > 2 else 0.0)
+    }
+    for name, column in values.items():
+        nx.set_node_attributes(G, dict(zip(nodes, column.tolist())), name)
+    G.graph["metrics_fingerprint"] = graph_fingerprint(G)
+    return G
+
+def node_importance(G: nx.Graph) -> dict:
+    # What rendering sizes by: PageRank when stored, else the degree-based size
+    return {
+        node: data["pagerank"] if "pagerank" in data else data.get("size", G.degree(node))
+        for node, data in G.nodes(data=True)
+    }
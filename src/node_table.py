@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import numpy as np
+
+# Columnar node storage. Concepts travel between stages as one table instead
+# of a list of dicts: interned ids, a description column, a contiguous
+# float32 embedding matrix and an id → row index. A node is just its row
+# number, so embeddings never round-trip through Python float lists.
+
+TABLE_PATH = "output/nodes"
+
+class NodeTable:
+    def __init__(self, ids=(), descriptions=(), vectors: np.ndarray | None = None, aliases: dict | None = None):
+        self.ids = [sys.intern(node_id) for node_id in ids]
+        self.descriptions = list(descriptions)
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.aliases = aliases or {}   # row → alias list, only for rows that absorbed duplicates
+        self.vectors = None
+        if vectors is not None:
+            self.set_vectors(vectors)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self.index
+
+    def set_vectors(self, vectors: np.ndarray):
+        # A mapped float16/float32 store is kept as-is; anything else becomes float32
+        vectors = np.asarray(vectors)
+        if vectors.dtype not in (np.float32, np.float16):
+            vectors = vectors.astype(np.float32)
+        if len(vectors) != len(self.ids):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(self.ids)} nodes")
+        self.vectors = vectors
+
+    @classmethod
+    def from_nodes(cls, nodes: list[dict]) -> "NodeTable":
+        # Converts the old list-of-dicts form; embeddings are kept if every node has one
+        vectors = None
+        if nodes and all("embedding" in n for n in nodes):
+            vectors = np.array([n["embedding"] for n in nodes], dtype=np.float32)
+        aliases = {i: n["aliases"] for i, n in enumerate(nodes) if n.get("aliases")}
+        return cls(
+            [n["id"] for n in nodes],
+            [n.get("description", "") for n in nodes],
+            vectors=vectors,
+            aliases=aliases
+        )
+
+    def records(self):
+        # Lightweight per-row dicts for code that still reads nodes one at a time
+        for i, node_id in enumerate(self.ids):
+            yield {"id": node_id, "description": self.descriptions[i], "aliases": self.aliases.get(i, [])}
+
+    def to_nodes(self, with_embeddings: bool = True) -> list[dict]:
+        nodes = list(self.records())
+        if with_embeddings and self.vectors is not None:
+            for node, vector in zip(nodes, self.vectors.tolist()):
+                node["embedding"] = vector
+        return nodes
+
+    def take(self, rows: list[int], aliases: dict | None = None) -> "NodeTable":
+        # New table with just these rows, in this order; aliases are keyed by new row
+        return NodeTable(
+            [self.ids[i] for i in rows],
+            [self.descriptions[i] for i in rows],
+            vectors=None if self.vectors is None else self.vectors[rows],
+            aliases=aliases
+        )
+
+    def nbytes(self) -> int:
+        # Rough footprint: strings, index and the matrix
+        strings = sum(sys.getsizeof(s) for s in self.ids) + sum(sys.getsizeof(s) for s in self.descriptions)
+        vectors = 0 if self.vectors is None else self.vectors.nbytes
+        return strings + sys.getsizeof(self.index) + vectors
+
+    def save(self, path: str = TABLE_PATH):
+        os.makedirs(path, exist_ok=True)
+        if self.vectors is not None:
+            np.save(os.path.join(path, "vectors.tmp.npy"), np.ascontiguousarray(self.vectors))
+            os.replace(os.path.join(path, "vectors.tmp.npy"), os.path.join(path, "vectors.npy"))
+        with open(os.path.join(path, "nodes.tmp.json"), "w") as f:
+            json.dump({
+                "ids": self.ids,
+                "descriptions": self.descriptions,
+                "aliases": {str(i): a for i, a in self.aliases.items()},
+                "has_vectors": self.vectors is not None
+            }, f)
+        os.replace(os.path.join(path, "nodes.tmp.json"), os.path.join(path, "nodes.json"))
+        print(f"Node table saved to {path} ({len(self)} nodes)")
+
+    @classmethod
+    def load(cls, path: str = TABLE_PATH, mmap: bool = True) -> "NodeTable":
+        with open(os.path.join(path, "nodes.json"), "r") as f:
+            data = json.load(f)
+        vectors = None
+        if data["has_vectors"]:
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        return cls(
+            data["ids"],
+            data["descriptions"],
+            vectors=vectors,
+            aliases={int(i): a for i, a in data["aliases"].items()}
+        )
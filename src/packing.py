@@ -0,0 +1,134 @@
+import json
+import re
+from src.concepts import MODEL, extract_concepts, merge_results, get_backend
+from src.tokens import count_tokens
+
+# Packs several chunks into one request so the fixed system prompt overhead
+# is paid once per pack instead of once per chunk.
+
+PACKED_SYSTEM_PROMPT = """
+You are a knowledge graph extractor. You will receive several numbered passages of text. Extract the key concepts and relationships from EACH passage separately.
+
+Rules:
+- Extract 3 to 7 most important concepts per passage. No more, no less.
+- Concepts must be meaningful ideas, theories, or principles — NOT people, chapter titles, or book names
+- Relationships must be concise verb phrases: "enables", "causes", "depends on", "contradicts"
+- Every edge source and target must exactly match a node id from the same passage
+- Return one result per passage, using the passage number as "chunk"
+- Return ONLY raw JSON. No markdown. No explanation. No code blocks.
+
+Output format:
+{
+  "results": [
+    {
+      "chunk": 12,
+      "nodes": [
+        {"id": "concept name", "description": "one sentence explanation"}
+      ],
+      "edges": [
+        {"source": "concept name", "target": "concept name", "relationship": "verb phrase"}
+      ]
+    }
+  ]
+}
+"""
+
+# Output tokens reserved per passage — 7 nodes + edges fit comfortably
+OUTPUT_TOKENS_PER_CHUNK = 400
+
+def plan_packs(chunks: list[dict], token_budget: int = 8000, max_pack: int = 8) -> list[list[dict]]:
+    # Greedy in chunk order — each pack's prompt plus reserved output stays in budget
+    overhead = count_tokens(PACKED_SYSTEM_PROMPT, MODEL) + 20
+    packs, current, used = [], [], overhead
+
+    for chunk in chunks:
+        text_tokens = chunk.get("tokens") or count_tokens(chunk["text"], MODEL)
+        cost = text_tokens + OUTPUT_TOKENS_PER_CHUNK + 10  # + passage header
+        if current and (used + cost > token_budget or len(current) >= max_pack):
+            packs.append(current)
+            current, used = [], overhead
+        current.append(chunk)
+        used += cost
+
+    if current:
+        packs.append(current)
+    return packs
+
+def build_packed_messages(pack: list[dict]) -> list[dict]:
+    passages = "\n\n".join(f"[Passage {c['chunk_index']}]\n{c['text']}" for c in pack)
+    return [
+        {"role": "system", "content": PACKED_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Extract concepts from each of these passages:\n\n{passages}"}
+    ]
+
+def _is_valid_result(result) -> bool:
+    if not isinstance(result, dict):
+        return False
+    nodes, edges = result.get("nodes"), result.get("edges")
+    if not isinstance(nodes, list) or not isinstance(edges, list) or not nodes:
+        return False
+    if not all(isinstance(n, dict) and isinstance(n.get("id"), str) for n in nodes):
+        return False
+    return all(isinstance(e, dict) and {"source", "target", "relationship"} <= e.keys() for e in edges)
+
+def parse_packed_response(raw: str, expected: list[int]) -> dict[int, dict]:
+    # Returns only the well-formed per-chunk results; anything missing is malformed
+    raw = re.sub(r'```json|```', '', raw).strip()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return {}
+
+    parsed = {}
+    for result in data.get("results", []) if isinstance(data, dict) else []:
+        if not isinstance(result, dict):
+            continue
+        try:
+            index = int(result.get("chunk"))
+        except (TypeError, ValueError):
+            continue
+        if index in expected and _is_valid_result(result):
+            parsed[index] = {"nodes": result["nodes"], "edges": result["edges"]}
+    return parsed
+
+def extract_pack(pack: list[dict], backend=None) -> dict[int, dict]:
+    backend = backend or get_backend()
+
+    # A lone chunk goes through the normal single-chunk path
+    if len(pack) == 1:
+        return {pack[0]["chunk_index"]: extract_concepts(pack[0]["text"], backend)}
+
+    raw = backend.complete(build_packed_messages(pack), OUTPUT_TOKENS_PER_CHUNK * len(pack))
+    parsed = parse_packed_response(raw, [c["chunk_index"] for c in pack])
+
+    # Split whatever came back malformed in half and retry each side
+    failed = [c for c in pack if c["chunk_index"] not in parsed]
+    if failed:
+        print(f"  {len(failed)}/{len(pack)} results malformed, splitting and retrying")
+        middle = (len(failed) + 1) // 2
+        for part in (failed[:middle], failed[middle:]):
+            if part:
+                parsed.update(extract_pack(part, backend))
+    return parsed
+
+def extract_all_concepts_packed(chunks: list[dict], max_chunks: int = 50, token_budget: int = 8000,
+                                max_pack: int = 8, cache=None, backend=None) -> dict:
+    selected = chunks[:max_chunks]
+    # Packed results come from another prompt and per-passage output budget, so they
+    # live under their own key and never answer a single-chunk lookup (or vice versa)
+    if cache:
+        cache = cache.for_prompt(f"{PACKED_SYSTEM_PROMPT}\n[output tokens per passage: {OUTPUT_TOKENS_PER_CHUNK}]")
+    results = {c["chunk_index"]: cache.get(c["text"]) if cache else None for c in selected}
+    pending = [c for c in selected if results[c["chunk_index"]] is None]
+
+    packs = plan_packs(pending, token_budget=token_budget, max_pack=max_pack)
+    for i, pack in enumerate(packs):
+        print(f"Processing pack {i+1}/{len(packs)} ({len(pack)} chunks)...")
+        for index, result in extract_pack(pack, backend).items():
+            results[index] = result
+
+    if cache:
+        for chunk in pending:
+            cache.put(chunk["text"], results[chunk["chunk_index"]])
+
+    return merge_results([results[c["chunk_index"]] for c in selected])
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+import numpy as np
+from src.async_concepts import extract_all_concepts_concurrent
+from src.embeddings import MODEL_NAME, embedding_text, get_model
+from src.embedding_store import text_hash, store_exists, load_embedding_store, merge_embedding_store
+from src.node_table import NodeTable
+
+# Overlapped extraction → embedding. The async extractor pushes each finished
+# chunk's concepts onto a queue and an embedding worker thread encodes them
+# in micro-batches while the network-bound extraction is still running.
+
+_DONE = object()
+
+class EmbeddingWorker(threading.Thread):
+    def __init__(self, batch_size: int = 64, max_wait: float = 0.25, known: dict | None = None):
+        super().__init__(name="embedding-worker", daemon=True)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.vectors = {}       # embedding text → vector
+        self.known = known or {}  # text hash → vector from an embedding store
+        self.error = None
+        self._queued = set()
+
+    def submit(self, nodes: list[dict]):
+        # Called from the extraction side — skip texts already queued or encoded
+        for node in nodes:
+            text = embedding_text(node)
+            if text in self._queued:
+                continue
+            self._queued.add(text)
+            stored = self.known.get(text_hash(text))
+            if stored is not None:
+                self.vectors[text] = stored
+            else:
+                self.queue.put(text)
+
+    def close(self):
+        self.queue.put(_DONE)
+
+    def _next_batch(self) -> tuple[list[str], bool]:
+        # Block for the first text, then take whatever else arrives within
+        # max_wait so a trickle of chunks still forms reasonable batches
+        first = self.queue.get()
+        if first is _DONE:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def run(self):
+        try:
+            model = get_model()
+            finished = False
+            while not finished:
+                batch, finished = self._next_batch()
+                if batch:
+                    for text, vector in zip(batch, model.encode(batch, batch_size=self.batch_size)):
+                        self.vectors[text] = vector
+        except Exception as e:
+            # The queue is unbounded, so submit() never blocks on a dead worker —
+            # just stop and let extract_and_embed re-raise after join()
+            self.error = e
+
+def _load_known(store_path: str | None) -> dict:
+    if not store_path or not store_exists(store_path):
+        return {}
+    store = load_embedding_store(store_path, mmap=False)
+    if store["model"] != MODEL_NAME:
+        return {}
+    return dict(zip(store["hashes"], store["vectors"]))
+
+def extract_and_embed(chunks: list[dict], max_chunks: int = 50, concurrency: int = 8,
+                      batch_size: int = 64, store_path: str | None = None, as_table: bool = False,
+                      **kwargs) -> dict:
+    # store_path reuses vectors from (and adds new ones to) a binary embedding store.
+    # as_table returns "nodes" as a NodeTable with one float32 matrix instead of per-node lists.
+    worker = EmbeddingWorker(batch_size=batch_size, known=_load_known(store_path))
+    worker.start()
+
+    try:
+        results = extract_all_concepts_concurrent(
+            chunks,
+            max_chunks=max_chunks,
+            concurrency=concurrency,
+            on_result=lambda index, result: worker.submit(result["nodes"]),
+            **kwargs
+        )
+    finally:
+        worker.close()
+        worker.join()
+
+    if worker.error is not None:
+        raise worker.error
+
+    # Dedup ran on chunk order, so look vectors up by the surviving node's text
+    missing = [n for n in results["nodes"] if embedding_text(n) not in worker.vectors]
+    if missing:
+        texts = [embedding_text(n) for n in missing]
+        for text, vector in zip(texts, get_model().encode(texts)):
+            worker.vectors[text] = vector
+
+    texts = [embedding_text(n) for n in results["nodes"]]
+    vectors = np.stack([worker.vectors[t] for t in texts]).astype(np.float32) if texts else None
+
+    # Merged into the store rather than replacing it — earlier runs' vectors stay cached
+    if store_path and texts:
+        merge_embedding_store(
+            [n["id"] for n in results["nodes"]],
+            [text_hash(t) for t in texts],
+            vectors,
+            path=store_path
+        )
+
+    if as_table:
+        results["nodes"] = NodeTable(
+            [n["id"] for n in results["nodes"]],
+            [n["description"] for n in results["nodes"]],
+            vectors=vectors
+        )
+    else:
+        for node, vector in zip(results["nodes"], vectors if vectors is not None else []):
+            node["embedding"] = vector.tolist()
+
+    print(f"Embedded {len(results['nodes'])} concepts alongside extraction")
+    return results
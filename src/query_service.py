@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+# Sys path so `python src/query_service.py` works from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.graph import load_graph
+from src.graph_store import CSRGraph, GRAPH_PATH, graph_exists
+from src.clustering import cluster_graph
+from src.search import ConceptSearchIndex, SEARCH_PATH, search_index_exists
+from src.lod import LODHierarchy, LOD_PATH, lod_exists
+
+# Local HTTP query service over a saved graph. Everything is answered from
+# the CSR arrays plus indices built once at startup (id → row, cluster →
+# members); hot results are kept in an LRU cache.
+#
+#   GET /ego?node=X&radius=1       ego network: nodes and the edges between them
+#   GET /neighbors?node=X&k=2      k-hop neighbourhood with hop distances
+#   GET /path?source=X&target=Y    fewest-hop path between two concepts
+#   GET /cluster?node=X            cluster id and the other members
+#   GET /search?q=text&k=10        ranked concepts by name/description, typo-tolerant
+#   GET /lod?expand=L2:3,L1:7      level-of-detail view, given super-nodes expanded
+#   GET /stats                     graph size and cache hit rate
+
+MAX_RESULT_NODES = 2000
+
+class LRUCache:
+    def __init__(self, max_items: int = 4096):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+class GraphQueryIndex:
+    def __init__(self, csr: CSRGraph, cache_size: int = 4096, search: ConceptSearchIndex | None = None,
+                 lod: LODHierarchy | None = None):
+        self.csr = csr
+        self.search_index = search or ConceptSearchIndex.from_graph(csr)
+        self.lod_hierarchy = lod
+        self.ids = list(csr.ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.indptr = np.asarray(csr.indptr)
+        self.indices = np.asarray(csr.indices)
+        self.cache = LRUCache(cache_size)
+
+        # Cluster membership — from the column saved with the graph, else computed once here
+        if "cluster" in csr.node_columns:
+            self.clusters = np.asarray(csr.node_columns["cluster"])
+        else:
+            node_cluster = cluster_graph(csr.to_networkx())
+            self.clusters = np.array([node_cluster[node_id] for node_id in self.ids], dtype=np.int64)
+        order = np.argsort(self.clusters, kind="stable")
+        bounds = np.searchsorted(self.clusters[order], np.arange(self.clusters.max() + 2)) if len(order) else [0]
+        self.cluster_members = [order[bounds[c]:bounds[c + 1]] for c in range(len(bounds) - 1)]
+
+    @classmethod
+    def load(cls, path: str = GRAPH_PATH, cache_size: int = 4096, search_path: str = SEARCH_PATH,
+             lod_path: str = LOD_PATH) -> "GraphQueryIndex":
+        # A binary graph directory, or a node-link graph.json converted once at startup.
+        # The persisted search index is used when present, otherwise built here;
+        # the LOD hierarchy only exists for large books and is never built here.
+        if os.path.isdir(path) and graph_exists(path):
+            csr = CSRGraph.load(path)
+        else:
+            csr = CSRGraph.from_networkx(load_graph(path))
+        search = ConceptSearchIndex.load(search_path) if search_index_exists(search_path) else None
+        lod = LODHierarchy.load(lod_path) if lod_exists(lod_path) else None
+        return cls(csr, cache_size=cache_size, search=search, lod=lod)
+
+    def row(self, node_id: str) -> int:
+        if node_id not in self.index:
+            raise KeyError(node_id)
+        return self.index[node_id]
+
+    def _neighbors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def _hops(self, start: int, k: int) -> dict:
+        # BFS out to k hops, capped so a hub can't return the whole graph
+        dist = {start: 0}
+        frontier = [start]
+        for hop in range(1, k + 1):
+            next_frontier = []
+            for i in frontier:
+                for j in self._neighbors(i).tolist():
+                    if j not in dist:
+                        dist[j] = hop
+                        next_frontier.append(j)
+                        if len(dist) >= MAX_RESULT_NODES:
+                            return dist
+            frontier = next_frontier
+        return dist
+
+    def _edges_within(self, rows: list[int]) -> list[dict]:
+        members = set(rows)
+        edges = []
+        for i in rows:
+            start, end = self.indptr[i], self.indptr[i + 1]
+            for slot, j in zip(range(start, end), self.indices[start:end].tolist()):
+                if j in members and i <= j:
+                    edges.append(self._edge(i, j, slot))
+        return edges
+
+    def _edge(self, i: int, j: int, slot: int) -> dict:
+        return {
+            "source": self.ids[i],
+            "target": self.ids[j],
+            "weight": float(self.csr.weights[slot]),
+            "edge_type": self.csr.edge_type_names[int(self.csr.edge_types[slot])],
+            "relationship": self.csr.relationship_names[int(self.csr.relationships[slot])]
+        }
+
+    def _cached(self, key: tuple, compute):
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return result
+
+    def ego(self, node_id: str, radius: int = 1) -> dict:
+        def compute():
+            rows = list(self._hops(self.row(node_id), radius))
+            return {"center": node_id, "nodes": [self.ids[i] for i in rows], "edges": self._edges_within(rows)}
+        return self._cached(("ego", node_id, radius), compute)
+
+    def neighborhood(self, node_id: str, k: int = 2) -> dict:
+        def compute():
+            dist = self._hops(self.row(node_id), k)
+            return {"center": node_id, "nodes": [{"id": self.ids[i], "hops": h} for i, h in dist.items()]}
+        return self._cached(("neighbors", node_id, k), compute)
+
+    def shortest_path(self, source: str, target: str) -> dict:
+        def compute():
+            return {"source": source, "target": target, "path": self._bidirectional_bfs(self.row(source), self.row(target))}
+        return self._cached(("path", source, target), compute)
+
+    def _bidirectional_bfs(self, s: int, t: int) -> list[str] | None:
+        # Expands the smaller frontier each round; meets in the middle
+        if s == t:
+            return [self.ids[s]]
+        parents = [{s: None}, {t: None}]
+        frontiers = [deque([s]), deque([t])]
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            for _ in range(len(frontiers[side])):
+                i = frontiers[side].popleft()
+                for j in self._neighbors(i).tolist():
+                    if j in parents[side]:
+                        continue
+                    parents[side][j] = i
+                    if j in parents[1 - side]:
+                        return self._join_path(parents, j)
+                    frontiers[side].append(j)
+        return None
+
+    def _join_path(self, parents: list[dict], meet: int) -> list[str]:
+        left, node = [], meet
+        while node is not None:
+            left.append(node)
+            node = parents[0][node]
+        right, node = [], parents[1][meet]
+        while node is not None:
+            right.append(node)
+            node = parents[1][node]
+        return [self.ids[i] for i in left[::-1] + right]
+
+    def cluster(self, node_id: str) -> dict:
+        def compute():
+            cluster_id = int(self.clusters[self.row(node_id)])
+            members = self.cluster_members[cluster_id]
+            return {
+                "node": node_id,
+                "cluster_id": cluster_id,
+                "size": len(members),
+                "members": [self.ids[i] for i in members[:MAX_RESULT_NODES].tolist()]
+            }
+        return self._cached(("cluster", node_id), compute)
+
+    def search(self, query: str, k: int = 10) -> dict:
+        def compute():
+            return {"query": query, "results": self.search_index.search(query, k=k)}
+        return self._cached(("search", query, k), compute)
+
+    def lod(self, expand: list[str]) -> dict:
+        if self.lod_hierarchy is None:
+            raise ValueError("No level-of-detail hierarchy for this graph")
+        key = tuple(sorted(set(expand)))
+        return self._cached(("lod", key), lambda: self.lod_hierarchy.view(key))
+
+    def stats(self) -> dict:
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "nodes": self.csr.number_of_nodes(),
+            "edges": self.csr.number_of_edges(),
+            "clusters": len(self.cluster_members),
+            "cache_items": len(self.cache.items),
+            "cache_hit_rate": self.cache.hits / lookups if lookups else 0.0
+        }
+
+def make_handler(index: GraphQueryIndex):
+    def int_param(params, name, default, low, high):
+        value = int(params.get(name, [default])[0])
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low} and {high}")
+        return value
+
+    def required(params, name):
+        if name not in params:
+            raise ValueError(f"Missing parameter '{name}'")
+        return params[name][0]
+
+    routes = {
+        "/ego": lambda p: index.ego(required(p, "node"), int_param(p, "radius", 1, 1, 3)),
+        "/neighbors": lambda p: index.neighborhood(required(p, "node"), int_param(p, "k", 2, 1, 4)),
+        "/path": lambda p: index.shortest_path(required(p, "source"), required(p, "target")),
+        "/cluster": lambda p: index.cluster(required(p, "node")),
+        "/search": lambda p: index.search(required(p, "q"), int_param(p, "k", 10, 1, 100)),
+        "/lod": lambda p: index.lod([key for key in p.get("expand", [""])[0].split(",") if key]),
+        "/stats": lambda p: index.stats()
+    }
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            route = routes.get(url.path)
+            if route is None:
+                return self._send(404, {"error": f"Unknown endpoint {url.path}"})
+            try:
+                self._send(200, route(parse_qs(url.query)))
+            except KeyError as e:
+                self._send(404, {"error": f"Unknown concept '{e.args[0]}'"})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # per-request logging would dominate latency under load
+
+    QueryHandler.index = index
+    return QueryHandler
+
+def serve(path: str = GRAPH_PATH, host: str = "127.0.0.1", port: int = 8000, cache_size: int = 4096) -> ThreadingHTTPServer:
+    index = GraphQueryIndex.load(path, cache_size=cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(index))
+    print(f"Serving {index.csr.number_of_nodes()} concepts on http://{host}:{server.server_port}")
+    return server
+
+if __name__ == "__main__":
+    # Usage: python src/query_service.py [--graph output/graph_csr] [--port 8000]
+    parser = argparse.ArgumentParser(description="Local knowledge-graph query service")
+    parser.add_argument("--graph", default=GRAPH_PATH if graph_exists() else "output/graph.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    args = parser.parse_args()
+    serve(args.graph, args.host, args.port, args.cache_size).serve_forever()
@@ -0,0 +1,161 @@
+import re
+import numpy as np
+from src.embeddings import similar_pair_indices
+from src.node_table import NodeTable
+
+# Entity resolution — merges near-duplicate concepts ("LLM", "large language
+# models", "Large Language Model (LLM)") into one canonical node with an
+# alias list, and rewrites edges so no relationship is lost to a spelling.
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.rank = [0] * n
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+def normalize_key(text: str) -> str:
+    text = re.sub(r"\([^)]*\)", " ", text.lower())      # drop "(LLM)" style asides
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(_singular(w) for w in text.split())
+
+def _acronyms(text: str) -> set[str]:
+    # Acronyms a concept can be referred to by — "(LLM)" asides, or the
+    # id itself when it's written as an acronym
+    found = {a.lower() for a in re.findall(r"\(([A-Z][A-Za-z0-9]{1,7})\)", text)}
+    stripped = text.strip()
+    if re.fullmatch(r"[A-Z][A-Z0-9]{1,7}s?", stripped):
+        found.add(stripped.rstrip("s").lower())
+    return found
+
+def _initials(key: str) -> str:
+    words = key.split()
+    return "".join(w[0] for w in words) if len(words) > 1 else ""
+
+def resolve_entities(nodes: list[dict] | NodeTable, edges: list[dict], threshold: float = 0.9) -> dict:
+    # A NodeTable comes back as a NodeTable of the canonical rows
+    table = nodes if isinstance(nodes, NodeTable) else None
+    ids = table.ids if table is not None else [node["id"] for node in nodes]
+    n = len(ids)
+    uf = UnionFind(n)
+
+    # 1. Identical normalized keys
+    keys = [normalize_key(node_id) for node_id in ids]
+    by_key = {}
+    for i, key in enumerate(keys):
+        if key in by_key:
+            uf.union(i, by_key[key])
+        else:
+            by_key[key] = i
+
+    # 2. Acronyms — "LLM" joins "large language model" when those initials are unambiguous
+    by_initials = {}
+    for i, key in enumerate(keys):
+        initials = _initials(key)
+        if initials:
+            by_initials.setdefault(initials, set()).add(uf.find(i))
+    for i, node_id in enumerate(ids):
+        for acronym in _acronyms(node_id):
+            if acronym in by_key:
+                uf.union(i, by_key[acronym])
+            groups = by_initials.get(acronym, set())
+            if len(groups) == 1:
+                uf.union(i, next(iter(groups)))
+
+    # 3. Embedding nearest neighbours above a tight threshold
+    if table is not None:
+        embedded = list(range(n)) if table.vectors is not None else []
+    else:
+        embedded = [i for i, node in enumerate(nodes) if "embedding" in node]
+    if len(embedded) > 1:
+        if table is not None:
+            vectors = table.vectors
+        else:
+            vectors = np.asarray([nodes[i]["embedding"] for i in embedded], dtype=np.float32)
+        rows, cols, _ = similar_pair_indices(vectors, threshold=threshold)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            uf.union(embedded[r], embedded[c])
+
+    # Canonical member per group — the one most edges mention, then earliest seen
+    mentions = {}
+    for edge in edges:
+        for end in (edge["source"], edge["target"]):
+            mentions[end] = mentions.get(end, 0) + 1
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(uf.find(i), []).append(i)
+
+    canonical_of = {}
+    chosen = []
+    for members in groups.values():
+        best = max(members, key=lambda i: (mentions.get(ids[i], 0), -i))
+        chosen.append((min(members), best, [ids[i] for i in members if i != best]))
+        for i in members:
+            canonical_of[ids[i]] = ids[best]
+
+    # Keep the original first-seen order of groups
+    chosen.sort(key=lambda item: item[0])
+    if table is not None:
+        resolved = table.take(
+            [best for _, best, _ in chosen],
+            aliases={row: aliases for row, (_, _, aliases) in enumerate(chosen) if aliases}
+        )
+    else:
+        resolved = [{**nodes[best], "aliases": aliases} for _, best, aliases in chosen]
+
+    # Edge endpoints may use any spelling — exact, lowercase or normalized
+    lower_map = {node_id.lower().strip(): cid for node_id, cid in canonical_of.items()}
+    key_map = {keys[i]: canonical_of[ids[i]] for i in range(n)}
+
+    def lookup(node_id: str) -> str | None:
+        return (canonical_of.get(node_id)
+                or lower_map.get(node_id.lower().strip())
+                or key_map.get(normalize_key(node_id)))
+
+    rewritten = []
+    seen = set()
+    for edge in edges:
+        source, target = lookup(edge["source"]), lookup(edge["target"])
+        if source is None or target is None or source == target:
+            continue
+        signature = (min(source, target), max(source, target), edge.get("relationship"))
+        if signature in seen:
+            continue
+        seen.add(signature)
+        rewritten.append({**edge, "source": source, "target": target})
+
+    print(f"Resolved {n} → {len(resolved)} concepts, kept {len(rewritten)}/{len(edges)} edges")
+
+    return {
+        "nodes": resolved,
+        "edges": rewritten
+    }
@@ -0,0 +1,249 @@
+import bisect
+import hashlib
+import json
+import math
+import os
+import numpy as np
+import networkx as nx
+from src.graph_store import CSRGraph, StringTable, new_version_dir, publish_version, current_version_dir
+from src.node_table import NodeTable
+from src.resolve import normalize_key
+
+# Concept search over node ids and descriptions, persisted next to the graph:
+#   inverted index — token → (rows, weights) postings, id tokens weighted above description tokens
+#   trigram index  — character trigram → vocabulary tokens, for typo-tolerant matches
+#   exact ids      — sorted hashes of normalized ids, for an exact-name bonus
+# Vocabulary and trigram keys are stored sorted, so lookups are bisects and
+# loading maps arrays instead of re-tokenizing every node.
+# Semantic search is optional and reuses the existing embedding matrix.
+
+SEARCH_PATH = "output/search"
+ID_WEIGHT = 3.0
+PREFIX_QUALITY = 0.8
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_CANDIDATES = 5
+
+def tokenize(text: str) -> list[str]:
+    return normalize_key(text).split()
+
+def trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _key_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def _csr(groups: list[list], dtype) -> tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum([len(g) for g in groups], out=indptr[1:])
+    values = np.fromiter((v for g in groups for v in g), dtype=dtype, count=int(indptr[-1]))
+    return indptr, values
+
+class ConceptSearchIndex:
+    def __init__(self, ids: StringTable, descriptions: StringTable, vocab: list[str], idf: np.ndarray,
+                 post_indptr: np.ndarray, post_rows: np.ndarray, post_weights: np.ndarray,
+                 trigram_keys: list[str], tri_indptr: np.ndarray, tri_vocab: np.ndarray,
+                 vocab_trigram_counts: np.ndarray, id_hashes: np.ndarray, id_rows: np.ndarray):
+        self.ids = ids
+        self.descriptions = descriptions
+        self.vocab = vocab
+        self.idf = idf
+        self.post_indptr = post_indptr
+        self.post_rows = post_rows
+        self.post_weights = post_weights
+        self.trigram_keys = trigram_keys
+        self.tri_indptr = tri_indptr
+        self.tri_vocab = tri_vocab
+        self.vocab_trigram_counts = vocab_trigram_counts
+        self.id_hashes = id_hashes
+        self.id_rows = id_rows
+        self.vectors = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: list[str], descriptions: list[str]) -> "ConceptSearchIndex":
+        postings = {}
+        for row, (node_id, description) in enumerate(zip(ids, descriptions)):
+            counts = {}
+            for token in tokenize(node_id):
+                counts[token] = counts.get(token, 0.0) + ID_WEIGHT
+            for token in tokenize(description):
+                counts[token] = counts.get(token, 0.0) + 1.0
+            for token, tf in counts.items():
+                # Saturating term frequency, so long descriptions don't dominate
+                postings.setdefault(token, []).append((row, tf / (tf + 1.0)))
+
+        vocab = sorted(postings)
+        n = max(len(ids), 1)
+        idf = np.array([math.log(1 + n / len(postings[t])) for t in vocab], dtype=np.float32)
+        post_indptr, post_rows = _csr([[r for r, _ in postings[t]] for t in vocab], np.int32)
+        _, post_weights = _csr([[w for _, w in postings[t]] for t in vocab], np.float32)
+
+        by_trigram = {}
+        for v, token in enumerate(vocab):
+            for gram in trigrams(token):
+                by_trigram.setdefault(gram, []).append(v)
+        trigram_keys = sorted(by_trigram)
+        tri_indptr, tri_vocab = _csr([by_trigram[g] for g in trigram_keys], np.int32)
+
+        hashes = np.array([_key_hash(normalize_key(node_id)) for node_id in ids], dtype=np.int64)
+        order = np.argsort(hashes, kind="stable")
+
+        print(f"Search index built: {len(ids)} concepts, {len(vocab)} terms, {len(trigram_keys)} trigrams")
+        return cls(
+            StringTable.from_strings(list(ids)),
+            StringTable.from_strings(list(descriptions)),
+            vocab, idf, post_indptr, post_rows, post_weights,
+            trigram_keys, tri_indptr, tri_vocab,
+            np.array([len(trigrams(t)) for t in vocab], dtype=np.int32),
+            hashes[order], order.astype(np.int32)
+        )
+
+    @classmethod
+    def from_graph(cls, G: nx.Graph | CSRGraph | NodeTable) -> "ConceptSearchIndex":
+        if isinstance(G, CSRGraph):
+            ids = list(G.ids)
+            descriptions = list(G.descriptions) if G.descriptions is not None else [""] * len(ids)
+        elif isinstance(G, NodeTable):
+            ids, descriptions = G.ids, G.descriptions
+        else:
+            ids = list(G.nodes())
+            descriptions = [G.nodes[node].get("description", "") for node in ids]
+        return cls.build(ids, descriptions)
+
+    def _vocab_id(self, token: str) -> int | None:
+        i = bisect.bisect_left(self.vocab, token)
+        return i if i < len(self.vocab) and self.vocab[i] == token else None
+
+    def _prefix_ids(self, prefix: str, limit: int = 20) -> range:
+        start = bisect.bisect_left(self.vocab, prefix)
+        end = bisect.bisect_left(self.vocab, prefix + "\uffff", lo=start)
+        return range(start, min(end, start + limit))
+
+    def _fuzzy_ids(self, token: str) -> list[tuple[int, float]]:
+        grams = trigrams(token)
+        hits = []
+        for gram in grams:
+            i = bisect.bisect_left(self.trigram_keys, gram)
+            if i < len(self.trigram_keys) and self.trigram_keys[i] == gram:
+                hits.append(self.tri_vocab[self.tri_indptr[i]:self.tri_indptr[i + 1]])
+        if not hits:
+            return []
+
+        # Jaccard over trigram sets, counted only for candidates sharing a trigram
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        similarity = shared / (len(grams) + self.vocab_trigram_counts[candidates] - shared)
+        keep = similarity >= FUZZY_MIN_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        best = np.argsort(-similarity)[:FUZZY_CANDIDATES]
+        return list(zip(candidates[best].tolist(), similarity[best].tolist()))
+
+    def _term_matches(self, token: str, is_last: bool, fuzzy: bool) -> list[tuple[int, float]]:
+        exact = self._vocab_id(token)
+        matches = [(exact, 1.0)] if exact is not None else []
+        if is_last:
+            # Type-ahead: the token still being typed also matches as a prefix
+            matches += [(v, PREFIX_QUALITY) for v in self._prefix_ids(token) if v != exact]
+        if fuzzy and exact is None:
+            seen = {v for v, _ in matches}
+            matches += [(v, q) for v, q in self._fuzzy_ids(token) if v not in seen]
+        return matches
+
+    def lexical_scores(self, query: str, fuzzy: bool = True) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        tokens = tokenize(query)
+        for position, token in enumerate(tokens):
+            for v, quality in self._term_matches(token, position == len(tokens) - 1, fuzzy):
+                start, end = self.post_indptr[v], self.post_indptr[v + 1]
+                np.add.at(scores, self.post_rows[start:end], self.idf[v] * quality * self.post_weights[start:end])
+
+        # Exact (normalized) name match goes to the top
+        key = _key_hash(normalize_key(query))
+        lo = np.searchsorted(self.id_hashes, key, side="left")
+        hi = np.searchsorted(self.id_hashes, key, side="right")
+        if hi > lo:
+            scores[self.id_rows[lo:hi]] += scores.max() + 1.0
+        return scores
+
+    def attach_embeddings(self, node_ids: list[str], vectors: np.ndarray):
+        # Reuses an existing matrix (e.g. a mapped embedding store or NodeTable) —
+        # only a row mapping and the norms are kept, never a copy of the vectors
+        lookup = {node_id: i for i, node_id in enumerate(node_ids)}
+        rows = np.array([lookup.get(node_id, -1) for node_id in self.ids], dtype=np.int64)
+        norms = np.zeros(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), 8192):
+            norms[start:start + 8192] = np.linalg.norm(np.asarray(vectors[start:start + 8192], dtype=np.float32), axis=1)
+        self.vectors = (vectors, rows, np.maximum(norms, 1e-12))
+
+    def semantic_scores(self, query: str) -> np.ndarray:
+        from src.embeddings import get_model
+        vectors, rows, norms = self.vectors
+        q = np.asarray(get_model().encode([query])[0], dtype=np.float32)
+        sims = (np.asarray(vectors) @ (q / max(np.linalg.norm(q), 1e-12))) / norms
+        scores = np.full(len(self), -np.inf, dtype=np.float32)
+        present = rows >= 0
+        scores[present] = sims[rows[present]]
+        return scores
+
+    def search(self, query: str, k: int = 10, fuzzy: bool = True, semantic: bool = False) -> list[dict]:
+        scores = self.lexical_scores(query, fuzzy=fuzzy)
+        if semantic and self.vectors is not None:
+            # Reciprocal-rank fusion — lexical and cosine scores live on different scales
+            fused = np.zeros(len(self), dtype=np.float32)
+            for ranked in (self._top(scores, 100), self._top(self.semantic_scores(query), 100, floor=-np.inf)):
+                fused[ranked] += 1.0 / (60 + np.arange(1, len(ranked) + 1))
+            scores = fused
+
+        return [
+            {"id": self.ids[i], "description": self.descriptions[i], "score": float(scores[i])}
+            for i in self._top(scores, k).tolist()
+        ]
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int, floor: float = 0.0) -> np.ndarray:
+        candidates = np.flatnonzero(scores > floor)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def save(self, path: str = SEARCH_PATH):
+        os.makedirs(path, exist_ok=True)
+        # A fresh version directory published by one pointer swap (see graph_store) —
+        # the query service may have the previous version's arrays mapped
+        version_dir = new_version_dir(path)
+        self.ids.save(version_dir, "ids")
+        self.descriptions.save(version_dir, "descriptions")
+        for name in ("idf", "post_indptr", "post_rows", "post_weights", "tri_indptr", "tri_vocab",
+                     "vocab_trigram_counts", "id_hashes", "id_rows"):
+            np.save(os.path.join(version_dir, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(version_dir, "terms.json"), "w") as f:
+            json.dump({"vocab": self.vocab, "trigrams": self.trigram_keys}, f)
+        publish_version(path, version_dir)
+        print(f"Search index saved to {path}")
+
+    @classmethod
+    def load(cls, path: str = SEARCH_PATH, mmap: bool = True) -> "ConceptSearchIndex":
+        mmap_mode = "r" if mmap else None
+        version_dir = current_version_dir(path, "terms.json")
+        if version_dir is None:
+            raise FileNotFoundError(f"No search index saved at {path}")
+        path = version_dir
+        with open(os.path.join(path, "terms.json"), "r") as f:
+            terms = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        return cls(
+            StringTable.load(path, "ids", mmap_mode),
+            StringTable.load(path, "descriptions", mmap_mode),
+            terms["vocab"], array("idf"),
+            array("post_indptr"), array("post_rows"), array("post_weights"),
+            terms["trigrams"], array("tri_indptr"), array("tri_vocab"),
+            array("vocab_trigram_counts"), array("id_hashes"), array("id_rows")
+        )
+
+def search_index_exists(path: str = SEARCH_PATH) -> bool:
+    return current_version_dir(path, "terms.json") is not None
@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+
+# Token counting for chunk sizing and request planning. Uses tiktoken (a
+# declared dependency) and falls back to the ~4 characters per token rule,
+# with a warning, when it's missing or its BPE file can't be fetched.
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL):
+    try:
+        import tiktoken
+    except ImportError:
+        print("Warning: tiktoken is not installed, estimating tokens from characters (~4 per token)")
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # The BPE file is downloaded on first use — offline boxes fall back
+        print(f"Warning: tokenizer unavailable ({e.__class__.__name__}), estimating tokens from characters (~4 per token)")
+        return None
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, round(len(text) / 4))
+    return len(encoding.encode(text, disallowed_special=()))
+
+# Words with their leading whitespace line up with the BPE pre-tokenizer's
+# split points, so summing per-piece counts tracks the whole-text count
+# while each distinct word is only ever encoded once.
+PIECE_PATTERN = re.compile(r"\s*\S+")
+
+@lru_cache(maxsize=200_000)
+def piece_tokens(piece: str, model: str = DEFAULT_MODEL) -> int:
+    return count_tokens(piece, model)
+
+def split_pieces(text: str) -> list[str]:
+    return PIECE_PATTERN.findall(text)
+
+def count_message_tokens(messages: list[dict], model: str = DEFAULT_MODEL) -> int:
+    # Chat format adds ~3 tokens of framing per message plus 3 to prime the reply
+    return sum(count_tokens(m["content"], model) + 3 for m in messages) + 3
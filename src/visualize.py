@@ -1,16 +1,19 @@
 import plotly.graph_objects as go
+import numpy as np
 import networkx as nx
 import json
 import os
 from src.graph import load_graph
 from src.layout import load_layout
 from src.animate import assign_clusters, CLUSTER_COLORS
+from src.metrics import node_importance
 
 def build_plotly_graph(G: nx.Graph, pos: dict, output_path: str = "output/knowledge_graph.html"):
     print("Building interactive Plotly graph...")
     
     node_clusters = assign_clusters(G)
-    max_degree = max(dict(G.degree()).values())
+    importance = node_importance(G)
+    max_importance = max(importance.values()) or 1
     
     # ── Edge traces ──────────────────────────────────────────────
     # Separate LLM edges and embedding edges for different styling
@@ -64,9 +67,9 @@ def build_plotly_graph(G: nx.Graph, pos: dict, output_path: str = "output/knowle
         color = node_clusters.get(node, {}).get("color", "#FFFFFF")
         node_colors.append(color)
         
-        # Size by degree
-        degree = G.degree(node)
-        size = 8 + (degree / max_degree) * 40
+        # Size by precomputed importance (PageRank), label by stored degree
+        degree = G.nodes[node].get("size", 0)
+        size = 8 + (importance[node] / max_importance) * 40
         node_sizes.append(size)
         
         # Label — show on graph
@@ -78,6 +81,7 @@ def build_plotly_graph(G: nx.Graph, pos: dict, output_path: str = "output/knowle
         node_hover.append(
             f"<b>{node}</b><br>"
             f"Connections: {degree}<br>"
+            f"PageRank: {G.nodes[node].get('pagerank', 0):.4f}<br>"
             f"Cluster: {cluster_id}<br>"
             f"<i>{description}</i>"
         )
@@ -133,7 +137,8 @@ def build_plotly_3d_graph(G: nx.Graph, pos: dict, output_path: str = "output/kno
     print("Building 3D interactive Plotly graph...")
     
     node_clusters = assign_clusters(G)
-    max_degree = max(dict(G.degree()).values())
+    importance = node_importance(G)
+    max_importance = max(importance.values()) or 1
     
     # ── Edge traces ───────────────────────────────────────────────
     llm_edge_x, llm_edge_y, llm_edge_z = [], [], []
@@ -188,8 +193,9 @@ def build_plotly_3d_graph(G: nx.Graph, pos: dict, output_path: str = "output/kno
         color = node_clusters.get(node, {}).get("color", "#FFFFFF")
         node_colors.append(color)
         
-        degree = G.degree(node)
-        size = 4 + (degree / max_degree) * 20
+        # Size by precomputed importance (PageRank), label by stored degree
+        degree = G.nodes[node].get("size", 0)
+        size = 4 + (importance[node] / max_importance) * 20
         node_sizes.append(size)
         
         node_text.append(node if degree >= 4 else "")
@@ -199,6 +205,7 @@ def build_plotly_3d_graph(G: nx.Graph, pos: dict, output_path: str = "output/kno
         node_hover.append(
             f"<b>{node}</b><br>"
             f"Connections: {degree}<br>"
+            f"PageRank: {G.nodes[node].get('pagerank', 0):.4f}<br>"
             f"Cluster: {cluster_id}<br>"
             f"<i>{description}</i>"
         )
@@ -251,4 +258,100 @@ def build_plotly_3d_graph(G: nx.Graph, pos: dict, output_path: str = "output/kno
     fig.write_html(output_path)
     print(f"3D graph saved to {output_path}")
     
-    return fig
\ No newline at end of file
+    return fig
+
+def build_plotly_lod_graph(view: dict, output_path: str | None = None):
+    # Renders one LOD view (LODHierarchy.view) — super-nodes sized by how many
+    # concepts they hold, so the payload depends on the view, not the book.
+    # Interactive reruns only need the figure; pass output_path to also write HTML.
+    print(f"Building level-of-detail graph ({len(view['nodes'])} nodes)...")
+    
+    keys = {node["key"]: node for node in view["nodes"]}
+    is_3d = bool(view["nodes"]) and len(view["nodes"][0]["pos"]) == 3
+    scatter = go.Scatter3d if is_3d else go.Scatter
+    
+    # ── Edge trace ───────────────────────────────────────────────
+    edge_coords = [[] for _ in range(3 if is_3d else 2)]
+    for edge in view["edges"]:
+        p0, p1 = keys[edge["source"]]["pos"], keys[edge["target"]]["pos"]
+        for axis, coords in enumerate(edge_coords):
+            coords += [p0[axis], p1[axis], None]
+    
+    edge_trace = scatter(
+        **dict(zip("xyz", edge_coords)),
+        mode='lines',
+        line=dict(width=0.8, color='rgba(150,150,255,0.25)'),
+        hoverinfo='none',
+        name='Relationships'
+    )
+    
+    # ── Node trace ───────────────────────────────────────────────
+    max_count = max((node["count"] for node in view["nodes"]), default=1)
+    max_importance = max((node["importance"] for node in view["nodes"]), default=1) or 1
+    node_coords = [[node["pos"][axis] for node in view["nodes"]] for axis in range(len(edge_coords))]
+    node_sizes, node_colors, node_text, node_hover = [], [], [], []
+    
+    for node in view["nodes"]:
+        if node["level"] > 0:
+            # Super-nodes grow with the log of their concept count
+            node_sizes.append(10 + 30 * np.log1p(node["count"]) / np.log1p(max_count))
+            node_hover.append(
+                f"<b>{node['label']}</b><br>"
+                f"Concepts: {node['count']}<br>"
+                f"Level: {node['level']}<br>"
+                f"<i>Expand with key {node['key']}</i>"
+            )
+        else:
+            node_sizes.append(6 + 14 * node["importance"] / max_importance)
+            node_hover.append(f"<b>{node['label']}</b>")
+        node_colors.append(CLUSTER_COLORS[node["cluster"] % len(CLUSTER_COLORS)] if node["cluster"] >= 0 else "#FFFFFF")
+        node_text.append(node["label"] if node["level"] > 0 or node["importance"] >= 0.5 * max_importance else "")
+    
+    node_trace = scatter(
+        **dict(zip("xyz", node_coords)),
+        mode='markers+text',
+        hoverinfo='text',
+        text=node_text,
+        hovertext=node_hover,
+        textposition='top center',
+        textfont=dict(size=8, color='white'),
+        marker=dict(
+            size=node_sizes,
+            color=node_colors,
+            opacity=0.9,
+            line=dict(width=0.5, color='rgba(255,255,255,0.3)')
+        ),
+        name='Concepts'
+    )
+    
+    axis = dict(showgrid=False, zeroline=False, showticklabels=False)
+    layout = go.Layout(
+        title=dict(
+            text='📚 Book Knowledge Graph — Overview',
+            font=dict(size=20, color='white'),
+            x=0.5
+        ),
+        paper_bgcolor='#0D1117',
+        plot_bgcolor='#0D1117',
+        showlegend=True,
+        legend=dict(font=dict(color='white'), bgcolor='rgba(0,0,0,0.5)'),
+        hovermode='closest',
+        xaxis=axis,
+        yaxis=axis,
+        margin=dict(l=20, r=20, t=60, b=20)
+    )
+    if is_3d:
+        layout.scene = dict(
+            bgcolor='#0D1117',
+            xaxis=dict(**axis, showbackground=False),
+            yaxis=dict(**axis, showbackground=False),
+            zaxis=dict(**axis, showbackground=False)
+        )
+    
+    fig = go.Figure(data=[edge_trace, node_trace], layout=layout)
+    
+    if output_path:
+        fig.write_html(output_path)
+        print(f"Level-of-detail graph saved to {output_path}")
+    
+    return fig
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from src.async_concepts import RateLimiter, extract_all_concepts_concurrent
+
+# Runs the async extractor against a local OpenAI-compatible mock server.
+# Each chunk's text picks its behaviour: a list of error statuses to return
+# before succeeding, and a delay so completion order can differ from chunk order.
+# Run from the repo root: python -m unittest discover -s tests  (or pytest)
+
+PROMPT_PREFIX = "Extract concepts from this text:\n\n"
+
+class MockOpenAI:
+    def __init__(self, failures: dict | None = None, delays: dict | None = None, retry_after: str | None = None):
+        self.failures = {text: list(statuses) for text, statuses in (failures or {}).items()}
+        self.delays = delays or {}
+        self.retry_after = retry_after
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, text: str) -> int:
+        return sum(1 for t in self.requests if t == text)
+
+    def _handler(self):
+        mock_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                text = body["messages"][-1]["content"][len(PROMPT_PREFIX):]
+                with mock_server._lock:
+                    mock_server.requests.append(text)
+                    pending = mock_server.failures.get(text, [])
+                    status = pending.pop(0) if pending else 200
+                time.sleep(mock_server.delays.get(text, 0))
+
+                if status != 200:
+                    headers = {"retry-after": mock_server.retry_after} if mock_server.retry_after else {}
+                    return self._send(status, {"error": {"message": f"mock {status}", "type": "mock"}}, headers)
+
+                content = json.dumps({
+                    "nodes": [{"id": f"concept of {text}", "description": f"from {text}"}],
+                    "edges": []
+                })
+                self._send(200, {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                })
+
+            def _send(self, status: int, payload: dict, headers: dict | None = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def make_chunks(count: int) -> list[dict]:
+    # prompt_tokens set up front so the rate limiter never needs the tokenizer
+    return [{"text": f"chunk-{i}", "prompt_tokens": 50} for i in range(count)]
+
+@mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+class AsyncExtractionTest(unittest.TestCase):
+    def extract(self, server: MockOpenAI, chunks: list[dict], **kwargs) -> dict:
+        return extract_all_concepts_concurrent(chunks, max_chunks=len(chunks), base_url=server.base_url, **kwargs)
+
+    def test_429_is_retried_after_retry_after_and_throttles(self):
+        chunks = make_chunks(3)
+        with MockOpenAI(failures={"chunk-1": [429]}, retry_after="0.05") as server, \
+                mock.patch.object(RateLimiter, "on_throttle", autospec=True, side_effect=RateLimiter.on_throttle) as throttle, \
+                mock.patch("src.async_concepts._backoff", return_value=5.0) as backoff:
+            results = self.extract(server, chunks)
+
+        self.assertEqual(server.count("chunk-1"), 2)
+        self.assertEqual(throttle.call_count, 1)
+        backoff.assert_not_called()  # retry-after wins over the jittered backoff
+        self.assertEqual([n["id"] for n in results["nodes"]], [f"concept of chunk-{i}" for i in range(3)])
+
+    def test_5xx_is_retried_with_backoff(self):
+        chunks = make_chunks(2)
+        with MockOpenAI(failures={"chunk-0": [503, 500]}) as server, \
+                mock.patch.object(RateLimiter, "on_throttle", autospec=True) as throttle, \
+                mock.patch("src.async_concepts._backoff", return_value=0.01) as backoff:
+            results = self.extract(server, chunks)
+
+        self.assertEqual(server.count("chunk-0"), 3)
+        self.assertEqual([c.args for c in backoff.call_args_list], [(0,), (1,)])
+        throttle.assert_not_called()  # only 429 slows the limiter down
+        self.assertEqual(len(results["nodes"]), 2)
+
+    def test_non_retryable_status_raises(self):
+        from openai import BadRequestError
+        with MockOpenAI(failures={"chunk-0": [400]}) as server, self.assertRaises(BadRequestError):
+            self.extract(server, make_chunks(1))
+        self.assertEqual(server.count("chunk-0"), 1)
+
+    def test_gives_up_after_max_retries(self):
+        from openai import InternalServerError
+        with MockOpenAI(failures={"chunk-0": [502] * 10}) as server, \
+                mock.patch("src.async_concepts._backoff", return_value=0.01), \
+                self.assertRaises(InternalServerError):
+            self.extract(server, make_chunks(1))
+        self.assertEqual(server.count("chunk-0"), 7)  # first attempt + max_retries=6
+
+    def test_results_keep_chunk_order(self):
+        # Earlier chunks answer last, so completion order is the reverse of chunk order
+        chunks = make_chunks(6)
+        delays = {c["text"]: 0.05 * (len(chunks) - i) for i, c in enumerate(chunks)}
+        completed = []
+        with MockOpenAI(delays=delays) as server:
+            results = self.extract(server, chunks, concurrency=6, on_result=lambda i, result: completed.append(i))
+
+        self.assertEqual(completed, list(range(6))[::-1])
+        self.assertEqual([n["id"] for n in results["nodes"]], [f"concept of chunk-{i}" for i in range(6)])
+
+    def test_caller_backend_is_left_open(self):
+        class SharedBackend:
+            model = "mock"
+            closed = False
+
+            async def acomplete(self, messages, max_tokens):
+                return json.dumps({"nodes": [{"id": messages[-1]["content"], "description": ""}], "edges": []})
+
+            async def aclose(self):
+                self.closed = True
+
+        backend = SharedBackend()
+        results = extract_all_concepts_concurrent(make_chunks(2), max_chunks=2, backend=backend)
+        self.assertFalse(backend.closed)
+        self.assertEqual(len(results["nodes"]), 2)
+
+if __name__ == "__main__":
+    unittest.main()